@@ -1,17 +1,162 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Request, Response, jsonify, request
 from flask_cors import CORS
-import subprocess
+import atexit
+import io
+import logging
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+# The server has always run the teseract.py flavour of the pipeline
+os.environ.setdefault("OCR_EXTRACTION", "legacy")
+os.environ.setdefault("SCAN_FOLDER", r"C:\Users\CEO Ivo John Barroba\Downloads\dataset\scan")
+
+from jobs import JobService, QueueFull
+from receipt_ocr import config, pipeline, streaming  # imported once; workers below stay warm between requests
+from receipt_ocr.manifest import ScanManifest
+from receipt_ocr.metrics import metrics
+from receipt_ocr.ocr_backends import OCR_PROFILES
+
+logging.basicConfig(level=logging.INFO)
+
+
+class InMemoryRequest(Request):
+    # Keep multipart uploads in memory; werkzeug spools anything over 500KB to a temp file by default
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return io.BytesIO()
+
 
 app = Flask(__name__)
+app.request_class = InMemoryRequest
 CORS(app)  # Allow all origins by default
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get("MAX_UPLOAD_MB", 25)) * 1024 * 1024
+
+# ⚙️ OCR worker processes shared by every job, and how many jobs may be queued/running at once
+ocr_executor = pipeline.make_executor(config.workers)
+job_service = JobService(max_workers=1, max_pending=int(os.environ.get("JOB_QUEUE_DEPTH", 4)))
+
+
+@atexit.register
+def shutdown_workers():
+    job_service.shutdown()
+    if ocr_executor:
+        ocr_executor.shutdown(wait=False, cancel_futures=True)
+
+
+def restart_workers():
+    # A worker that dies (e.g. a native crash in tesserocr) breaks the whole pool for good
+    global ocr_executor
+    logging.warning("⚠️ OCR worker pool broke, starting a new one")
+    ocr_executor.shutdown(wait=False, cancel_futures=True)
+    ocr_executor = pipeline.make_executor(config.workers)
+
+
+def run_scan(folder_path, profile=None):
+    # Incremental: images already in the manifest (unchanged) are skipped
+    profile = profile or config.ocr_profile
+    manifest = ScanManifest(config.manifest_path)
+    for attempt in range(2):
+        try:
+            errors = pipeline.scan_folder(folder_path, config.workers, executor=ocr_executor, manifest=manifest,
+                                          profile=profile)
+            break
+        except BrokenProcessPool:
+            restart_workers()
+            if attempt:
+                raise
+            # Once more on the new pool: what was scanned before the crash is in the manifest and skipped
+    return {'folder': folder_path, 'profile': profile, 'errors': [{'file': f, 'error': e} for f, e in errors]}
+
+
+def requested_profile(body=None):
+    # OCR profile from the JSON body / form field / ?profile=, None means the server default (OCR_PROFILE)
+    profile = (body or {}).get('profile') or request.form.get('profile') or request.args.get('profile')
+    if profile and profile not in OCR_PROFILES:
+        raise ValueError(f'Unknown OCR profile {profile!r}, expected one of {sorted(OCR_PROFILES)}')
+    return profile or None
+
+
+def job_status(job):
+    return {key: job[key] for key in ('id', 'status', 'submitted_at', 'started_at', 'finished_at', 'error')}
+
 
 @app.route('/run-script', methods=['POST'])
 def run_script():
     try:
-        result = subprocess.run(['python', 'teseract.py'], check=True, capture_output=True, text=True)
-        return jsonify({'success': True, 'output': result.stdout})
-    except subprocess.CalledProcessError as e:
-        return jsonify({'success': False, 'error': str(e), 'output': e.output}), 500
+        profile = requested_profile(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    try:
+        job_id = job_service.submit(run_scan, config.folder_path, profile)
+    except QueueFull as e:
+        response = jsonify({'success': False, 'error': f'OCR queue is full ({e}), try again later'})
+        response.headers['Retry-After'] = '30'
+        return response, 429
+    return jsonify({'success': True, 'job_id': job_id, 'status_url': f'/jobs/{job_id}'}), 202
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_service.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Unknown job'}), 404
+    return jsonify({'success': True, 'job': job_status(job), 'queue_depth': job_service.depth()})
+
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    job = job_service.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Unknown job'}), 404
+    if job['status'] in ('queued', 'running'):
+        return jsonify({'success': False, 'job': job_status(job)}), 202
+    if job['status'] == 'failed':
+        return jsonify({'success': False, 'job': job_status(job)}), 500
+    return jsonify({'success': True, 'job': job_status(job), 'result': job['result']})
+
+
+@app.route('/ocr', methods=['POST'])
+def ocr_upload():
+    # Accepts a multipart "image" file or the raw image bytes as the request body; nothing touches disk
+    upload = request.files.get('image')
+    image_bytes = upload.read() if upload else request.get_data()
+    if not image_bytes:
+        return jsonify({'success': False, 'error': 'No image provided'}), 400
+    try:
+        profile = requested_profile()
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    try:
+        text, info, avg_conf, quality_flag = pipeline.ocr_image_bytes(image_bytes, profile=profile)
+    except pipeline.UnreadableImageError:
+        return jsonify({'success': False, 'error': 'Could not decode image'}), 400
+    info.pop(pipeline.FINGERPRINT_KEY, None)  # /ocr doesn't save the receipt, so it never becomes a reference
+    return jsonify({
+        'success': True,
+        'fields': info,
+        'ocr_confidence': round(avg_conf, 2) if avg_conf is not None else None,
+        'quality_flag': quality_flag,
+        'ocr_profile': info.get('ocr_profile'),
+        'raw_text': text,
+    })
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    # Prometheus text format by default, ?format=json for a JSON view of the same numbers
+    sinks = pipeline.opened_sinks()  # only sinks a scan already opened: a GET never opens one
+    gauges = {
+        'job_queue_depth': job_service.depth(),
+        'sink_rows_written': {sink.name: sink.written for sink in sinks},
+        'sink_rows_failed': {sink.name: sink.failed for sink in sinks},
+        'scan_queue_depth': streaming.queue_depths(),
+    }
+    for sink in sinks:
+        if sink.name == 'db':
+            gauges.update(db_rows_written=sink.written, db_rows_failed=sink.failed)
+    if request.args.get('format') == 'json':
+        return jsonify({**metrics.to_dict(), 'gauges': gauges})
+    return Response(metrics.render_prometheus(gauges=gauges), mimetype='text/plain; version=0.0.4')
+
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000)
@@ -0,0 +1,184 @@
+"""Near-duplicate lookup latency as the number of stored receipt hashes grows, and accuracy on rendered receipts.
+
+Latency: HammingIndex lookups (hash, then detail hash) with hashes clustered like real ones: receipts
+come from a few hundred tills of very different sizes (Zipf), each printing a handful of layouts, and
+same-layout receipts land a few bits apart (as phash puts them). Half the queries are re-photos (a
+stored receipt with a few hash bits and ~6% of its detail bits flipped), half are new receipts from the
+same tills. Prints the median and 99th percentile lookup time and how many stored hashes passed the
+hash stage per lookup.
+
+Accuracy (--rendered N): N distinct receipts from bench_pipeline.render_receipt are saved one after the
+other through a DuplicateIndex, then a re-photo of each (rescaled, reframed, relit, slightly rotated,
+recompressed) is looked up. For every hash and distance it prints how many distinct receipts were
+taken for an earlier one (false positives: with DEDUP_SKIP=1 they would be dropped unscanned) and how
+many re-photos were found, by the hash alone and once the detail hash confirms the match, then the
+detail mismatch of the closest distinct receipt and of the farthest re-photo (DEDUP_MISMATCH goes between).
+
+    python benchmarks/bench_dedup.py [--sizes 10000 100000 300000] [--distance 6] [--tills 200] [--rendered 100]
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_pipeline import render_receipt
+from receipt_ocr import config
+from receipt_ocr.dedup import (DETAIL_BITS, HASH_BITS, PERCEPTUAL_HASHES, DuplicateIndex, HammingIndex,
+                                detail_mismatch, fingerprint)
+
+LAYOUTS_PER_TILL = 10
+LAYOUT_FLIP = 0.095   # share of hash bits a till's layouts differ in from the till's usual hash
+RECEIPT_FLIP = 0.05   # and receipts from their layout's
+REPHOTO_DETAIL_FLIP = 0.06
+
+
+def flips(np_rng, count, bits, share):
+    # -> count bit masks, each bit set with probability share: as uint64 for bits=64, else as bytes
+    import numpy as np
+    masks = np.packbits(np_rng.random((count, bits)) < share, axis=1)
+    return masks.view(">u8").ravel().astype(np.uint64) if bits == HASH_BITS else masks
+
+
+def clustered_receipts(np_rng, count, tills):
+    # -> (hashes, details) of count receipts from tills of Zipf-distributed sizes
+    import numpy as np
+    centers = np_rng.integers(0, 1 << HASH_BITS, tills, dtype=np.uint64)
+    layouts = np.repeat(centers, LAYOUTS_PER_TILL) ^ flips(np_rng, tills * LAYOUTS_PER_TILL, HASH_BITS, LAYOUT_FLIP)
+    weights = 1 / np.arange(1, tills + 1)
+    till = np_rng.choice(tills, count, p=weights / weights.sum())
+    layout = till * LAYOUTS_PER_TILL + np_rng.integers(0, LAYOUTS_PER_TILL, count)
+    hashes = layouts[layout] ^ flips(np_rng, count, HASH_BITS, RECEIPT_FLIP)
+    details = np_rng.integers(0, 256, (count, DETAIL_BITS // 8), dtype=np.uint8)  # distinct receipts: ~half the bits
+    return hashes, details
+
+
+def flip_bits(np_rng, value_hash, bits):
+    for position in np_rng.choice(HASH_BITS, bits, replace=False):
+        value_hash ^= 1 << int(position)
+    return value_hash
+
+
+def jpeg_bytes(image, quality=90):
+    buffer = io.BytesIO()
+    image.convert("L").save(buffer, "JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def rephoto(rng, image):
+    # The same receipt photographed again: other scale and framing, lighting, a little rotation, recompressed
+    from PIL import ImageEnhance
+    scale = rng.uniform(0.6, 1.4)
+    image = image.resize((int(image.width * scale), int(image.height * scale)))
+    margins = [rng.uniform(0, 0.06) for _ in range(4)]
+    image = image.crop((int(image.width * margins[0]), int(image.height * margins[1]),
+                        image.width - int(image.width * margins[2]), image.height - int(image.height * margins[3])))
+    image = ImageEnhance.Brightness(image).enhance(rng.uniform(0.8, 1.2))
+    image = ImageEnhance.Contrast(image).enhance(rng.uniform(0.8, 1.2))
+    image = image.rotate(rng.uniform(-2, 2), fillcolor=70)
+    return jpeg_bytes(image, rng.randint(50, 90))
+
+
+def bench_latency(args):
+    import numpy as np
+    print(f"{args.tills} tills, largest {1 / sum(1 / rank for rank in range(1, args.tills + 1)):.0%} of the receipts, "
+          f"DEDUP_DISTANCE {args.distance}, DEDUP_MISMATCH {args.mismatch}")
+    print(f"{'stored':>8} {'build s':>8} {'p50 ms':>7} {'p99 ms':>7} {'hash matches':>13} {'re-photos':>10} {'false pos':>10}")
+    for size in args.sizes:
+        np_rng = np.random.default_rng(args.seed)
+        hashes, details = clustered_receipts(np_rng, size, args.tills)
+        start = time.perf_counter()
+        index = HammingIndex()
+        for i in range(size):
+            index.add(int(hashes[i]), details[i].tobytes(), i)
+        build_s = time.perf_counter() - start
+
+        new_hashes, new_details = clustered_receipts(np.random.default_rng(args.seed + 1), args.queries // 2, args.tills)
+        queries = []
+        for i in range(args.queries // 2):
+            stored = int(np_rng.integers(size))
+            detail = details[stored] ^ flips(np_rng, 1, DETAIL_BITS, REPHOTO_DETAIL_FLIP)[0]
+            queries.append((flip_bits(np_rng, int(hashes[stored]), int(np_rng.integers(args.distance + 1))),
+                            detail.tobytes(), stored))
+            queries.append((int(new_hashes[i]), new_details[i].tobytes(), None))
+        times, candidates, found, false_pos = [], 0, 0, 0
+        for value_hash, detail, stored in queries:
+            start = time.perf_counter()
+            matches = index.search(value_hash, args.distance, detail, args.mismatch)
+            times.append(time.perf_counter() - start)
+            candidates += len(index.search(value_hash, args.distance))
+            if stored is None:
+                false_pos += bool(matches)
+            else:
+                found += any(match[2] == stored for match in matches)
+        p50, p99 = np.percentile(times, [50, 99]) * 1000
+        half = len(queries) // 2
+        print(f"{size:>8} {build_s:>8.2f} {p50:>7.3f} {p99:>7.3f} {candidates / len(queries):>13.1f} "
+              f"{found:>4}/{half:<5} {false_pos:>4}/{half:<5}")
+
+
+def bench_rendered(args):
+    rng = random.Random(args.seed)
+    originals, rephotos = [], []
+    for _ in range(args.rendered):
+        image, _, _ = render_receipt(rng)
+        originals.append(jpeg_bytes(image))
+        rephotos.append(rephoto(rng, image))
+
+    count = args.rendered
+    print(f"\n{count} rendered receipts, DEDUP_MISMATCH {args.mismatch}")
+    print(f"{'hash':>6} {'bits':>5} {'false pos (hash)':>17} {'false pos':>10} {'re-photos (hash)':>17} "
+          f"{'re-photos':>10} {'ms/lookup':>10}")
+    for method in PERCEPTUAL_HASHES:
+        original_prints = [fingerprint(image_bytes, method) for image_bytes in originals]
+        rephoto_prints = [fingerprint(image_bytes, method) for image_bytes in rephotos]
+        closest_distinct = min(detail_mismatch(a[1], b[1]) for i, a in enumerate(original_prints)
+                               for b in original_prints[i + 1:])
+        farthest_rephoto = max(detail_mismatch(a[1], b[1]) for a, b in zip(original_prints, rephoto_prints))
+        for distance in args.rendered_distances:
+            with tempfile.TemporaryDirectory() as tmp:
+                index = DuplicateIndex(os.path.join(tmp, "hashes.sqlite3"), method)
+                hash_fp = confirmed_fp = 0
+                lookups, start = 0, time.perf_counter()
+                for i, (value_hash, detail) in enumerate(original_prints):
+                    hash_fp += bool(index.index.search(value_hash, distance))
+                    confirmed_fp += index.find(value_hash, detail, f"r{i}", distance, args.mismatch) is not None
+                    lookups += 1
+                    index.add(value_hash, detail, f"r{i}")  # every distinct receipt gets saved
+                hash_found = found = 0
+                for i, (value_hash, detail) in enumerate(rephoto_prints):
+                    hash_found += any(match[2] == f"r{i}" for match in index.index.search(value_hash, distance))
+                    match = index.find(value_hash, detail, f"p{i}", distance, args.mismatch)
+                    found += match is not None and match[2] == f"r{i}"
+                    lookups += 1
+                lookup_ms = (time.perf_counter() - start) / lookups * 1000
+                index.conn.close()
+            print(f"{method:>6} {distance:>5} {hash_fp:>11}/{count:<5} {confirmed_fp:>4}/{count:<5} "
+                  f"{hash_found:>11}/{count:<5} {found:>4}/{count:<5} {lookup_ms:>10.1f}")
+        print(f"{method:>6} detail mismatch: closest distinct receipts {closest_distinct:.3f}, "
+              f"farthest re-photo {farthest_rephoto:.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 300000])
+    parser.add_argument("--distance", type=int, default=6)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--tills", type=int, default=200, help="tills the latency benchmark's receipts come from")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rendered", type=int, default=100, help="rendered receipts for the accuracy check (0: skip)")
+    parser.add_argument("--rendered-distances", type=int, nargs="+", default=[2, 4, 6, 8])
+    parser.add_argument("--mismatch", type=float, default=config.dedup_mismatch)
+    args = parser.parse_args()
+
+    bench_latency(args)
+    if args.rendered:
+        bench_rendered(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""In-process Tesseract handle (tesserocr) vs the tesseract binary per call (pytesseract).
+
+Both backends see the same preprocessed synthetic receipts. Reports engine load time, per-call
+latency for text, word data, and text + data (the legacy two-call path), plus how closely each
+backend's text agrees with the first one and with the rendered ground truth.
+
+    python benchmarks/bench_ocr_backends.py [--count 20] [--backends tesserocr pytesseract] [--output out.json]
+
+--profiles fast balanced accurate runs every backend once per OCR profile (speed/accuracy trade-off).
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from difflib import SequenceMatcher
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_pipeline import render_receipt, summarize
+from bench_preprocess import peak_rss_mb
+
+CALLS = ("image_to_string", "image_to_data", "image_to_string_and_data")
+
+
+def similarity(a, b):
+    return SequenceMatcher(None, " ".join(a.split()), " ".join(b.split())).ratio()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--backends", nargs="+", default=["tesserocr", "pytesseract"])
+    parser.add_argument("--profiles", nargs="+", default=["default"])
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    from receipt_ocr.ocr_backends import OCR_BACKENDS, get_profile
+    from receipt_ocr.preprocess import preprocess_image
+
+    rng = random.Random(args.seed)
+    images, truths = [], []
+    with tempfile.TemporaryDirectory(prefix="bench_ocr_") as workdir:
+        for i in range(args.count):
+            image, text, _ = render_receipt(rng)
+            path = os.path.join(workdir, f"{i}.jpg")
+            image.save(path, quality=90)
+            with open(path, "rb") as f:
+                images.append(preprocess_image(f.read()))
+            truths.append(text)
+
+    report = {"images": args.count, "backends": {}}
+    reference = None
+    runs = [(name, profile) for name in args.backends for profile in args.profiles]
+    for name, profile in runs:
+        label = name if args.profiles == ["default"] else f"{name}:{profile}"
+        start = time.perf_counter()
+        try:
+            backend = OCR_BACKENDS[name](None, get_profile(profile))
+            version = backend.version()  # pytesseract only finds out here that the binary is missing
+        except (ImportError, RuntimeError, OSError) as e:
+            report["backends"][label] = {"available": False, "error": f"{type(e).__name__}: {e}"}
+            continue
+        result = {"available": True, "version": version, "profile": profile,
+                  "load_ms": round((time.perf_counter() - start) * 1000, 2)}
+
+        texts = []
+        for call in CALLS:
+            samples = []
+            for image in images:
+                start = time.perf_counter()
+                output = getattr(backend, call)(image)
+                samples.append((time.perf_counter() - start) * 1000)
+                if call == "image_to_string":
+                    texts.append(output)
+            result[call] = summarize(samples)
+
+        result["ground_truth_similarity"] = round(sum(map(similarity, texts, truths)) / len(texts), 3)
+        if reference is None:
+            reference = texts
+        else:
+            result["agreement_with_first"] = round(sum(map(similarity, texts, reference)) / len(texts), 3)
+        report["backends"][label] = result
+    report["peak_rss_mb"] = peak_rss_mb()
+
+    out = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(out + "\n")
+    else:
+        print(out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""Offline end-to-end benchmark on synthetic receipts: per-stage latency, throughput, peak RSS, field accuracy.
+
+Renders receipts with known vendor/date/total (plus rotation, blur and noise), runs them through
+the receipt_ocr pipeline stage by stage with an in-memory SQLite DB and a temp archive folder, and
+writes one JSON report. Compare two reports to catch regressions between versions:
+
+    python benchmarks/bench_pipeline.py --count 50 --output before.json
+    python benchmarks/bench_pipeline.py --count 50 --output after.json --baseline before.json
+
+--skip-ocr feeds the rendered text straight to the text stages, for machines without tesseract.
+--cascade OCRs header/footer strips first (the "ocr" stage then includes the strips' own extraction).
+--tiles OCRs tall receipts as overlapping strips on parallel threads (try it with --lines 60).
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_preprocess import FIELDS, field_matches, peak_rss_mb
+from receipt_ocr.ocr_backends import OCR_PROFILES
+
+STAGES = ("read", "decode", "preprocess", "ocr", "corrections", "extraction", "archival", "db_write")
+VENDORS = ["JOLLIBEE", "WATSONS", "7-ELEVEN", "STARBUCKS", "CHOWKING", "Puregold", "MINISO", "SAVEMORE",
+           "Goldilocks", "ACE Hardware", "NATIONAL BOOKSTORE", "KENNY ROGERS ROASTERS"]
+ITEMS = ["Chickenjoy 2pc", "Iced Coffee", "Shampoo 180ml", "Bottled Water", "Burger Steak", "Notebook",
+         "Paracetamol 500mg", "Pancit Canton", "Rice Meal", "Toothpaste", "Siopao", "Batteries AA"]
+
+
+def render_receipt(rng, font_size=26, max_items=12):
+    from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+    vendor = rng.choice(VENDORS)
+    date = f"{rng.randint(2021, 2025):04d}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+    items = [(rng.choice(ITEMS), round(rng.uniform(15, 450), 2)) for _ in range(rng.randint(3, max_items))]
+    total = round(sum(price for _, price in items), 2)
+    year, month, day = date.split("-")
+    lines = [
+        vendor,
+        "123 Aguinaldo Hwy, Dasmarinas",
+        f"TIN 000-{rng.randint(100, 999)}-{rng.randint(100, 999)}-000",
+        f"{day}/{month}/{year} {rng.randint(8, 21):02d}:{rng.randint(0, 59):02d}",
+        "",
+        *(f"{name:<22}{price:>10.2f}" for name, price in items),
+        "",
+        f"{'TOTAL':<22}{total:>10.2f}",
+        f"{'CASH':<22}{total + rng.randint(0, 200):>10.2f}",
+        "THIS SERVES AS AN OFFICIAL RECEIPT",
+    ]
+    text = "\n".join(lines)
+
+    font = ImageFont.load_default(size=font_size)
+    line_height = int(font_size * 1.4)
+    paper = Image.new("L", (font_size * 20, line_height * (len(lines) + 2)), 245)
+    draw = ImageDraw.Draw(paper)
+    for i, line in enumerate(lines):
+        draw.text((font_size, line_height * (i + 1)), line, fill=20, font=font)
+
+    # Photo-like: paper on a darker table, slightly rotated and blurred, with sensor noise
+    canvas = Image.new("L", (int(paper.width * 1.5), int(paper.height * 1.3)), rng.randint(40, 110))
+    angle = rng.uniform(-6, 6)
+    mask = Image.new("L", paper.size, 255).rotate(angle, expand=True)
+    paper = paper.rotate(angle, expand=True)
+    canvas.paste(paper, ((canvas.width - paper.width) // 2, (canvas.height - paper.height) // 2), mask)
+    canvas = canvas.filter(ImageFilter.GaussianBlur(rng.uniform(0, 1.2)))
+    noise = Image.effect_noise(canvas.size, rng.uniform(5, 20))
+    canvas = Image.blend(canvas, noise, 0.08)
+
+    label = {"vendor": vendor, "date": date, "total": total}
+    return canvas, text, label
+
+
+def generate(folder, count, seed, max_items=12):
+    rng = random.Random(seed)
+    labels, texts = {}, {}
+    for i in range(count):
+        image, text, label = render_receipt(rng, max_items=max_items)
+        name = f"receipt_{i:04d}.jpg"
+        image.save(os.path.join(folder, name), quality=90)
+        labels[name] = label
+        texts[name] = text
+    return labels, texts
+
+
+def summarize(samples):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {
+        "mean_ms": round(sum(ordered) / len(ordered), 3),
+        "p50_ms": round(pick(0.5), 3),
+        "p95_ms": round(pick(0.95), 3),
+        "max_ms": round(ordered[-1], 3),
+        "total_ms": round(sum(ordered), 3),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args, workdir):
+    # Everything with side effects goes to workdir / memory; set before receipt_ocr reads its config
+    os.environ.update({
+        "DB_BACKEND": "sqlite",
+        "DB_PATH": ":memory:",
+        "OCR_CACHE_PATH": "",
+        "ARCHIVE_FOLDER": os.path.join(workdir, "archive"),
+        "OCR_EXTRACTION": args.extraction,
+        "OCR_BACKEND": args.backend,
+        "OCR_PROFILE": args.profile,
+        "PREPROCESS_MODE": args.mode,
+        "RECEIPT_CROP": "1" if args.crop else "0",
+        "OCR_CASCADE": "1" if args.cascade else "0",
+        "OCR_TILES": "1" if args.tiles else "0",
+    })
+    from receipt_ocr import config, pipeline
+    from receipt_ocr.metrics import metrics
+    from receipt_ocr.preprocess import binarize, decode_image
+
+    images = os.path.join(workdir, "images")
+    os.makedirs(images)
+    labels, texts = generate(images, args.count, args.seed, args.lines)
+
+    timings = {stage: [] for stage in STAGES}
+    correct = {field: 0 for field in FIELDS}
+    wall_start = time.perf_counter()
+
+    def timed(stage, fn, *fn_args):
+        start = time.perf_counter()
+        value = fn(*fn_args)
+        timings[stage].append((time.perf_counter() - start) * 1000)
+        return value
+
+    for name in sorted(labels):
+        image_path = os.path.join(images, name)
+        image_bytes = timed("read", pipeline.read_image, image_path)
+        gray = timed("decode", decode_image, image_bytes, config.preprocess_mode)
+        thresh = timed("preprocess", binarize, gray, config.preprocess_mode,
+                       config.target_text_height, config.receipt_crop)
+        if args.skip_ocr:
+            raw_text = texts[name]
+        else:
+            backend = pipeline.get_ocr_backend(args.profile)
+            raw_text = timed("ocr", pipeline.recognize, backend, thresh, args.extraction == "legacy", True,
+                             args.tiles)[0]
+
+        text = timed("corrections", lambda t: pipeline.filter_lines(
+            pipeline.apply_custom_corrections(pipeline.clean_ocr_text(t))), raw_text)
+        info, quality_flag = timed("extraction", pipeline.extract_structured_info, text)
+        info['image_path'] = timed("archival", pipeline.save_receipt_image, image_path, name)
+        info['raw_text'] = text
+        info['quality'] = quality_flag
+        timed("db_write", pipeline.save_to_database, info)
+
+        for field in FIELDS:
+            correct[field] += bool(field_matches(labels[name][field], info.get(field)))
+
+    # Whatever is still buffered belongs to the DB stage too
+    timed("db_write", pipeline.get_db_writer().flush)
+    wall_s = time.perf_counter() - wall_start
+    counters = metrics.to_dict()["counters"]
+
+    return {
+        "revision": git_revision(),
+        "python": sys.version.split()[0],
+        "config": {"count": args.count, "seed": args.seed, "extraction": args.extraction,
+                   "backend": args.backend if args.skip_ocr else pipeline.get_ocr_backend(args.profile).name,
+                   "profile": args.profile, "mode": args.mode, "crop": args.crop, "cascade": args.cascade,
+                   "tiles": args.tiles, "lines": args.lines, "ocr": not args.skip_ocr},
+        "images": args.count,
+        "wall_s": round(wall_s, 3),
+        "throughput_images_per_s": round(args.count / wall_s, 2) if wall_s else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "rows_written": pipeline.get_db_writer().written,
+        "ocr_megapixels": round(counters.get("ocr_pixels", {}).get("", 0) / 1e6, 2),
+        "cascade": counters.get("ocr_cascade", {}),
+        "stages": {stage: summarize(samples) for stage, samples in timings.items()},
+        "accuracy": {field: round(correct[field] / args.count, 3) for field in FIELDS},
+    }
+
+
+def compare(report, baseline, tolerance, min_delta_ms=1.0):
+    # -> list of human-readable regressions (slower stages beyond tolerance, any accuracy drop).
+    # Sub-millisecond stages jitter by more than any sane tolerance, hence the absolute floor.
+    regressions = []
+    for stage, stats in report["stages"].items():
+        before = (baseline.get("stages") or {}).get(stage)
+        if stats and before and stats["mean_ms"] > max(before["mean_ms"] * (1 + tolerance), before["mean_ms"] + min_delta_ms):
+            regressions.append(f"{stage}: {before['mean_ms']} -> {stats['mean_ms']} ms")
+    for field, accuracy in report["accuracy"].items():
+        before = (baseline.get("accuracy") or {}).get(field)
+        if before is not None and accuracy < before:
+            regressions.append(f"{field} accuracy: {before} -> {accuracy}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--extraction", default="rules", choices=["rules", "legacy", "final"])
+    parser.add_argument("--backend", default="auto", choices=["auto", "tesserocr", "pytesseract"])
+    parser.add_argument("--profile", default="default", choices=sorted(OCR_PROFILES))
+    parser.add_argument("--mode", default="full", choices=["full", "normalized"])
+    parser.add_argument("--crop", action="store_true", help="localize and crop the receipt before thresholding")
+    parser.add_argument("--cascade", action="store_true", help="header/footer strips first, full page on low confidence")
+    parser.add_argument("--tiles", action="store_true", help="OCR tall receipts as parallel overlapping strips")
+    parser.add_argument("--lines", type=int, default=12, help="max item lines per receipt (60+ for long receipts)")
+    parser.add_argument("--skip-ocr", action="store_true", help="use the rendered text instead of running tesseract")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="earlier JSON report; exit 1 if anything regressed")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed slowdown per stage (0.15 = 15%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="ignore slowdowns smaller than this")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_pipeline_") as workdir:
+        report = run(args, workdir)
+
+    out = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(out + "\n")
+    else:
+        print(out)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance, args.min_delta_ms)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Full-resolution vs reduced/normalized preprocessing: latency, peak RSS and field accuracy.
+
+Each mode runs in its own subprocess so peak RSS isn't shared between them. Append "+crop" to a
+mode (e.g. "full+crop") to localize and perspective-correct the receipt before thresholding, and
+"+adaptive", "+clahe" or "+morph" to binarize with that method instead of Otsu.
+
+    python benchmarks/bench_preprocess.py path/to/receipts [--labels labels.json] [--ocr]
+
+labels.json maps filename -> {"vendor": ..., "total": ..., "date": "YYYY-MM-DD"}; accuracy is
+only reported with --ocr (needs a working tesseract) and labels.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+FIELDS = ("vendor", "total", "date")
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def field_matches(expected, actual):
+    if expected is None:
+        return None
+    if isinstance(expected, (int, float)):
+        return actual is not None and abs(float(actual) - float(expected)) < 0.005
+    return str(actual or "").upper() == str(expected).upper()
+
+
+def run_mode(folder, mode, run_ocr, labels):
+    # Child process: time every image through one preprocessing mode
+    from receipt_ocr.preprocess import BINARIZATIONS, preprocess_image
+
+    if run_ocr:
+        from receipt_ocr import pipeline
+
+    base_mode, *options = mode.split("+")
+    crop = "crop" in options
+    method = next((option for option in options if option in BINARIZATIONS), "otsu")
+
+    files = sorted(f for f in os.listdir(folder) if f.lower().endswith(('.jpg', '.jpeg', '.png')))
+    prep_ms, ocr_ms, megapixels, confidences = [], [], [], []
+    correct = {field: 0 for field in FIELDS}
+    labelled = {field: 0 for field in FIELDS}
+    for name in files:
+        with open(os.path.join(folder, name), 'rb') as f:
+            image_bytes = f.read()
+        start = time.perf_counter()
+        thresh = preprocess_image(image_bytes, base_mode, crop=crop, method=method)
+        prep_ms.append((time.perf_counter() - start) * 1000)
+        if thresh is None:
+            continue
+        megapixels.append(thresh.shape[0] * thresh.shape[1] / 1e6)
+        if not run_ocr:
+            continue
+
+        start = time.perf_counter()
+        ocr_data = pipeline.get_ocr_backend().image_to_data(thresh)
+        ocr_ms.append((time.perf_counter() - start) * 1000)
+        raw_text = pipeline.data_to_text(ocr_data)
+        confidences.append(pipeline.confidence_from_data(ocr_data)[0])
+        text = pipeline.filter_lines(pipeline.apply_custom_corrections(pipeline.clean_ocr_text(raw_text)))
+        info, _ = pipeline.extract_structured_info(text)
+        for field in FIELDS:
+            ok = field_matches(labels.get(name, {}).get(field), info.get(field))
+            if ok is not None:
+                labelled[field] += 1
+                correct[field] += ok
+
+    result = {
+        "mode": mode,
+        "images": len(files),
+        "preprocess_ms_mean": round(sum(prep_ms) / len(prep_ms), 2) if prep_ms else None,
+        "preprocess_ms_max": round(max(prep_ms), 2) if prep_ms else None,
+        "ocr_megapixels_mean": round(sum(megapixels) / len(megapixels), 2) if megapixels else None,
+        "ocr_ms_mean": round(sum(ocr_ms) / len(ocr_ms), 2) if ocr_ms else None,
+        "ocr_confidence_mean": round(sum(confidences) / len(confidences), 1) if confidences else None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    for field in FIELDS:
+        if labelled[field]:
+            result[f"{field}_accuracy"] = round(correct[field] / labelled[field], 3)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("folder")
+    parser.add_argument("--labels")
+    parser.add_argument("--ocr", action="store_true", help="also OCR + extract and score fields")
+    parser.add_argument("--modes", nargs="+", default=["full", "normalized", "full+crop", "normalized+crop"])
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    labels = {}
+    if args.labels:
+        with open(args.labels, encoding='utf-8') as f:
+            labels = json.load(f)
+
+    if args.child:
+        print(json.dumps(run_mode(args.folder, args.child, args.ocr, labels)))
+        return
+
+    results = []
+    for mode in args.modes:
+        cmd = [sys.executable, os.path.abspath(__file__), args.folder, "--child", mode]
+        if args.labels:
+            cmd += ["--labels", args.labels]
+        if args.ocr:
+            cmd.append("--ocr")
+        out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+        results.append(json.loads(out.strip().splitlines()[-1]))
+
+    columns = sorted({key for result in results for key in result}, key=lambda k: (k != "mode", k))
+    print(" ".join(f"{c:>20}" for c in columns))
+    for result in results:
+        print(" ".join(f"{str(result.get(c, '-')):>20}" for c in columns))
+
+
+if __name__ == "__main__":
+    main()
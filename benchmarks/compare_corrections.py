@@ -0,0 +1,91 @@
+"""CorrectionEngine against the one-re.sub-per-entry loop it replaced, on randomized receipt text.
+
+Text is built from the correction entries themselves (in random case, next to each other and to
+punctuation), their replacements and ordinary receipt words, and both implementations must rewrite
+it identically with the built-in tables of each extraction.
+
+    python benchmarks/compare_corrections.py [--count 20000] [--seed 0]
+
+Where the two differ by design the old loop is given the engine's semantics, so only regressions show:
+  - entries are escaped and bounded by (?<!\\w) / (?!\\w) instead of \\b, which never matched next
+    to an entry's leading/trailing punctuation ("Subtota]", "Q!Save", "Tota!");
+  - entries run longest first: where two overlap the engine takes the longest ("Net Tota!" over
+    "Tota!"), the old loop whichever came first in the dict.
+Exits non-zero and prints the first mismatches when any text differs.
+"""
+import argparse
+import os
+import random
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from receipt_ocr.corrections import CorrectionEngine
+from receipt_ocr.pipeline import custom_corrections, extra_corrections
+
+WORDS = ["TOTAL", "Cash", "Change", "VAT", "12.00", "1,250.50", "Receipt", "No.", "SM", "Item", "x2", "TURK'S",
+         "Starbucks", "Coffee", "QTY", "05/12/2024", "Php", "SUBTOTAL", "Net", "Amount"]
+SEPARATORS = [" ", " ", " ", "\n", "  ", ": ", ",", ".", "-", "(", ")", "!", "'", "", "_"]
+
+
+def random_case(rng, word):
+    mode = rng.random()
+    if mode < 0.5:
+        return word
+    if mode < 0.7:
+        return word.upper()
+    if mode < 0.9:
+        return word.lower()
+    return "".join(ch.upper() if rng.random() < 0.5 else ch.lower() for ch in word)
+
+
+def random_text(rng, corrections):
+    entries = list(corrections)
+    parts = []
+    for _ in range(rng.randint(5, 40)):
+        kind = rng.random()
+        if kind < 0.4:
+            token = random_case(rng, rng.choice(entries))
+        elif kind < 0.55:
+            token = rng.choice(list(corrections.values()))
+        else:
+            token = rng.choice(WORDS)
+        parts.append(token + rng.choice(SEPARATORS))
+    return "".join(parts)
+
+
+def legacy_apply(text, corrections):
+    # The old loop, one re.sub per entry, with the two adjustments above
+    for wrong, right in sorted(corrections.items(), key=lambda item: -len(item[0])):
+        text = re.sub(r'(?<!\w)' + re.escape(wrong) + r'(?!\w)', lambda m: right, text, flags=re.IGNORECASE)
+    return text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=20000, help="random texts per extraction")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    failed = False
+    for extraction, extra in extra_corrections.items():
+        corrections = {**custom_corrections, **extra}
+        engine = CorrectionEngine(corrections)
+        rng = random.Random(args.seed)
+        mismatches = []
+        for _ in range(args.count):
+            text = random_text(rng, corrections)
+            expected = legacy_apply(text, corrections)
+            got = engine.apply(text)
+            if got != expected:
+                mismatches.append((text, expected, got))
+        print(f"{extraction:>8}: {args.count - len(mismatches)}/{args.count} match")
+        for text, expected, got in mismatches[:5]:
+            print(f"    {text!r}\n      old {expected!r}\n      new {got!r}")
+        failed = failed or bool(mismatches)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+"""ExtractionRules against the per-pattern findall / strptime code it replaced, on randomized receipts.
+
+The old finalfinal.py code below is kept verbatim (pattern table, fallback, date formats); the rules
+come from receipt_ocr/extraction_rules.json. For every receipt both must give the same date,
+date_confidence, total and total_confidence.
+
+    python benchmarks/compare_extraction_rules.py [--count 30000] [--seed 0] [--rules path.json]
+
+Exits non-zero and prints the first mismatches when any field differs. Run it after editing the
+rules file: a rule change that should change results then shows exactly which receipts moved.
+"""
+import argparse
+import os
+import random
+import re
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from receipt_ocr import config
+from receipt_ocr.extraction_rules import load_rules
+
+OLD_PATTERN_WEIGHTS = {
+    r'\bGRAND TOTAL\b[^\d]{0,10}(\d{1,6}(?:[.,]\d{2}))': 100,
+    r'\bNET TOTAL\b[^\d]{0,10}(\d{1,6}(?:[.,]\d{2}))': 95,
+    r'\bTOTAL DUE\b[^\d]{0,10}(\d{1,6}(?:[.,]\d{2}))': 90,
+    r'\bAMOUNT DUE\b[^\d]{0,10}(\d{1,6}(?:[.,]\d{2}))': 90,
+    r'\bDINE[- ]IN TOTAL\b[^\d]{0,10}(\d{1,6}(?:[.,]\d{2}))': 90,
+    r'\bAPP(?:ROVED)?(?:\s*AMOUNT)?[^\d]{0,10}(\d{1,6}(?:[.,]\d{2}))': 90,
+    r'\b2US\s*APP\b[^\d]{0,10}(\d{1,6}(?:[.,]\d{2}))': 90,
+    r'\bTOTAL\b[^\d]{0,15}(?:PHP|Php|php)?\s*(\d{1,6}(?:[.,]?\d{2}))': 85,
+    r'\bSUB[- ]?TOTAL\b[^\d]{0,15}(?:PHP|Php|php)?\s*(\d{1,6}(?:[.,]?\d{2}))': 60,
+    r'\bSubtotal\b[^\d]{0,15}(\d{1,6}(?:[.,]\d{2}))': 60,
+    r'\bCash Tendered\s*(?:\+|:)?\s*(?:P)?\s*(\d{1,6}(?:[.,]\d{2}))': 70,
+}
+OLD_DATE_FORMATS = [
+    "%d-%m-%Y", "%d/%m/%Y", "%m-%d-%Y", "%m/%d/%Y",
+    "%d-%m-%y", "%d/%m/%y", "%m-%d-%y", "%m/%d/%y"
+]
+
+LABELS = ["GRAND TOTAL", "NET TOTAL", "TOTAL DUE", "AMOUNT DUE", "DINE-IN TOTAL", "DINE IN TOTAL", "APPROVED AMOUNT",
+          "APP", "APPROVED", "2US APP", "TOTAL", "SUB-TOTAL", "SUB TOTAL", "SUBTOTAL", "Subtotal", "Cash Tendered",
+          "CASH", "CHANGE", "VAT", "Total", "total", "TOTALS", "Item", "QTY 2"]
+GLUE = [" ", ": ", " : ", " PHP ", " Php", " php ", " P", " P ", "....", " + ", ":P", "\t", " (2) ", "", " ="]
+ITEMS = ["Chickenjoy", "Iced Coffee", "Bottled Water", "Rice Meal", "SN 1234", "TIN 123-456-789", "Thank you!"]
+
+
+def random_amount(rng):
+    kind = rng.random()
+    whole = rng.randint(0, 999999) if rng.random() < 0.2 else rng.randint(0, 2000)
+    if kind < 0.5:
+        return f"{whole}.{rng.randint(0, 99):02d}"
+    if kind < 0.65:
+        return f"{whole:,}.{rng.randint(0, 99):02d}"
+    if kind < 0.75:
+        return f"{whole},{rng.randint(0, 99):02d}"
+    if kind < 0.85:
+        return f"{whole}{rng.randint(0, 99):02d}"
+    if kind < 0.92:
+        return f"{whole}.{rng.randint(0, 99):02d}".replace("0", "O", 1)
+    return str(whole)
+
+
+def random_date(rng):
+    day, month = rng.randint(0, 33), rng.randint(0, 14)
+    year = rng.choice([f"{rng.randint(1990, 2030)}", f"{rng.randint(0, 99):02d}", f"{rng.randint(0, 999)}"])
+    sep1, sep2 = rng.choice("/-"), rng.choice("/-")
+    day = f"{day:02d}" if rng.random() < 0.5 else str(day)
+    month = f"{month:02d}" if rng.random() < 0.5 else str(month)
+    return f"{day}{sep1}{month}{sep2}{year}"
+
+
+def random_receipt(rng):
+    lines = []
+    for _ in range(rng.randint(1, 15)):
+        kind = rng.random()
+        if kind < 0.5:
+            lines.append(f"{rng.choice(LABELS)}{rng.choice(GLUE)}{random_amount(rng)}")
+        elif kind < 0.65:
+            lines.append(f"{rng.choice(['Date', 'DATE:', ''])} {random_date(rng)} {rng.randint(0, 23)}:{rng.randint(0, 59):02d}")
+        elif kind < 0.85:
+            lines.append(f"{rng.choice(ITEMS)} {random_amount(rng)}")
+        else:
+            lines.append(rng.choice(ITEMS))
+    return "\n".join(lines)
+
+
+def old_fields(text):
+    # finalfinal.py's extract_structured_info before the rules file, date and total parts only
+    data = {}
+    date_match = re.search(r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})', text)
+    if date_match:
+        raw_date = date_match.group(1)
+        for fmt in OLD_DATE_FORMATS:
+            try:
+                parsed_date = datetime.strptime(raw_date, fmt)
+                data['date'] = parsed_date.strftime("%Y-%m-%d")
+                data['date_confidence'] = 90
+                break
+            except ValueError:
+                continue
+        if 'date' not in data:
+            data['date'] = raw_date
+            data['date_confidence'] = 50
+
+    matched_totals = []
+    for pattern, weight in OLD_PATTERN_WEIGHTS.items():
+        for match in re.findall(pattern, text, re.IGNORECASE):
+            try:
+                matched_totals.append((float(match.replace(',', '').replace('O', '0')), weight))
+            except ValueError:
+                continue
+    if matched_totals:
+        data['total'], data['total_confidence'] = max(matched_totals, key=lambda x: x[0])
+    else:
+        fallback_amounts = re.findall(r'(\d{1,6}(?:[.,]\d{2}))', text)
+        try:
+            numbers = [float(a.replace(',', '').replace('O', '0')) for a in fallback_amounts]
+            if numbers:
+                max_number = max(numbers)
+                data['total'] = max_number
+                if len(numbers) == 1:
+                    data['total_confidence'] = 85
+                elif max_number > 500:
+                    data['total_confidence'] = 80
+                elif max_number > 100:
+                    data['total_confidence'] = 70
+                else:
+                    data['total_confidence'] = 50
+        except ValueError:
+            pass
+    return data
+
+
+def new_fields(text, rules):
+    # The same fields the way pipeline.extract_structured_info_rules gets them from the rules
+    data = {}
+    date_match = rules.find_date(text)
+    if date_match:
+        raw_date, parsed_date = date_match
+        data['date'], data['date_confidence'] = (parsed_date, 90) if parsed_date else (raw_date, 50)
+
+    matched_totals = rules.find_totals(text)
+    if matched_totals:
+        data['total'], data['total_confidence'] = max(matched_totals, key=lambda x: x[0])
+    else:
+        numbers = rules.find_amounts(text)
+        if numbers:
+            max_number = max(numbers)
+            data['total'] = max_number
+            if len(numbers) == 1:
+                data['total_confidence'] = 85
+            elif max_number > 500:
+                data['total_confidence'] = 80
+            elif max_number > 100:
+                data['total_confidence'] = 70
+            else:
+                data['total_confidence'] = 50
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=30000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rules", default=config.extraction_rules_file)
+    args = parser.parse_args()
+
+    rules = load_rules(args.rules)
+    rng = random.Random(args.seed)
+    mismatches = []
+    for _ in range(args.count):
+        text = random_receipt(rng)
+        expected, got = old_fields(text), new_fields(text, rules)
+        if got != expected:
+            mismatches.append((text, expected, got))
+    print(f"{args.count - len(mismatches)}/{args.count} receipts match")
+    for text, expected, got in mismatches[:5]:
+        print(f"    {text!r}\n      old {expected!r}\n      new {got!r}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
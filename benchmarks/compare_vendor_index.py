@@ -0,0 +1,109 @@
+"""VendorIndex against the per-line, per-store fuzzywuzzy loops it replaced, on randomized receipt headers.
+
+Every mode must pick the same store with the same score as the old loop:
+  token_sort (extract_vendor), ratio (legacy first-line match), partial (legacy extract_vendor).
+Lines are known stores with OCR-style damage, unrelated words and amounts, and punctuation-only lines.
+
+    python benchmarks/compare_vendor_index.py [--count 2000] [--seed 0]
+
+Exits non-zero and prints the first mismatches when any mode disagrees.
+"""
+import argparse
+import os
+import random
+import string
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fuzzywuzzy import fuzz
+
+from receipt_ocr.pipeline import known_stores
+from receipt_ocr.vendor_index import VendorIndex
+
+# mode -> (old scorer, threshold the pipeline uses)
+MODES = {
+    "token_sort": (fuzz.token_sort_ratio, 75),
+    "ratio": (fuzz.ratio, 75),
+    "partial": (fuzz.partial_ratio, 80),
+}
+WORDS = ["OFFICIAL", "RECEIPT", "TIN", "VAT", "REG", "INVOICE", "CASHIER", "BRANCH", "MALL", "CORP", "INC.",
+         "TOTAL", "CASH", "CHANGE", "QTY", "STORE", "MART", "COFFEE", "SM", "CITY", "BLDG", "No."]
+PUNCTUATION = ["&", "-", "*", "***", "---", "#", "&&", "!", "'", ".", ",", "( )", "=="]
+
+
+def damage(rng, store):
+    # OCR-style errors: dropped, doubled or swapped characters, case changes, extra words around the name
+    chars = list(store)
+    for _ in range(rng.randint(0, 3)):
+        i = rng.randrange(len(chars))
+        op = rng.random()
+        if op < 0.3:
+            del chars[i]
+        elif op < 0.6:
+            chars[i] = rng.choice(string.ascii_uppercase + "0123456789!]|")
+        elif op < 0.8:
+            chars.insert(i, chars[i])
+        if not chars:
+            chars = ["X"]
+    line = "".join(chars)
+    if rng.random() < 0.3:
+        line = line.lower() if rng.random() < 0.5 else line.title()
+    if rng.random() < 0.3:
+        line = f"{rng.choice(WORDS)} {line}"
+    if rng.random() < 0.3:
+        line = f"{line} {rng.choice(WORDS)}"
+    if rng.random() < 0.2:
+        line = line[:rng.randint(1, len(line))]
+    return line
+
+
+def random_line(rng):
+    kind = rng.random()
+    if kind < 0.45:
+        return damage(rng, rng.choice(known_stores))
+    if kind < 0.75:
+        return " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4)))
+    if kind < 0.9:
+        return f"{rng.randint(1, 99)} {rng.choice(WORDS)} {rng.randint(1, 9999)}.{rng.randint(0, 99):02d}"
+    return rng.choice(PUNCTUATION)
+
+
+def old_best_match(lines, scorer, threshold):
+    best_match = None
+    best_score = 0
+    for line in lines:
+        for store in known_stores:
+            score = scorer(line.upper(), store.upper())
+            if score > best_score and score > threshold:
+                best_score = score
+                best_match = store
+    return best_match, best_score
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=2000, help="random headers per mode")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    index = VendorIndex(known_stores)
+    failed = False
+    for mode, (scorer, threshold) in MODES.items():
+        rng = random.Random(args.seed)
+        mismatches = []
+        for _ in range(args.count):
+            lines = [random_line(rng) for _ in range(rng.randint(1, 10))]
+            expected = old_best_match(lines, scorer, threshold)
+            got = index.best_match(lines, mode, threshold)[:2]
+            if got != expected:
+                mismatches.append((lines, expected, got))
+        print(f"{mode:>10}: {args.count - len(mismatches)}/{args.count} match")
+        for lines, expected, got in mismatches[:5]:
+            print(f"    {lines!r}\n      old {expected!r}, index {got!r}")
+        failed = failed or bool(mismatches)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueueFull(Exception):
+    pass
+
+
+class JobService:
+    """Runs jobs on a fixed thread pool, with a hard cap on queued + running jobs."""
+
+    def __init__(self, max_workers=1, max_pending=4, keep_finished=200):
+        self.max_pending = max_pending
+        self.keep_finished = keep_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ocr-job")
+        self._jobs = OrderedDict()
+        self._active = 0
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs):
+        with self._lock:
+            if self._active >= self.max_pending:
+                raise QueueFull(f"{self._active} job(s) already queued or running")
+            self._active += 1
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                "id": job_id,
+                "status": "queued",
+                "submitted_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "result": None,
+                "error": None,
+            }
+        self._executor.submit(self._run, job_id, fn, args, kwargs)
+        return job_id
+
+    def _run(self, job_id, fn, args, kwargs):
+        job = self._jobs[job_id]
+        job["status"] = "running"
+        job["started_at"] = time.time()
+        try:
+            job["result"] = fn(*args, **kwargs)
+            job["status"] = "done"
+        except Exception as e:
+            logging.exception(f"❌ Job {job_id} failed")
+            job["error"] = f"{type(e).__name__}: {e}"
+            job["status"] = "failed"
+        finally:
+            job["finished_at"] = time.time()
+            with self._lock:
+                self._active -= 1
+                self._prune()
+
+    def _prune(self):
+        finished = [jid for jid, job in self._jobs.items() if job["finished_at"] is not None]
+        for jid in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[jid]
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def depth(self):
+        return self._active
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
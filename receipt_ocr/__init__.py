@@ -0,0 +1,6 @@
+"""Receipt OCR pipeline: preprocessing, Tesseract, corrections, field extraction and storage.
+
+Importing the package is cheap; OpenCV, Tesseract and fuzzywuzzy load on first use.
+Settings come from environment variables (see receipt_ocr.config); run
+``python -m receipt_ocr --help`` for the command line.
+"""
@@ -0,0 +1,52 @@
+import logging
+import os
+import shutil
+import tempfile
+
+from .manifest import file_sha256
+
+
+def archive_image(image_path, destination_folder, hardlink=True):
+    """Store image_path under its content hash in destination_folder; returns the stored filename.
+
+    Identical uploads map to the same name and are stored once.
+    """
+    os.makedirs(destination_folder, exist_ok=True)
+    ext = os.path.splitext(image_path)[1].lower()
+    stored_name = f"{file_sha256(image_path)}{ext}"
+    destination_path = os.path.join(destination_folder, stored_name)
+    if os.path.exists(destination_path):
+        logging.info(f"🖼️ Duplicate image, already archived as: {destination_path}")
+        return stored_name
+
+    if hardlink:
+        try:
+            os.link(image_path, destination_path)
+            logging.info(f"🖼️ Image linked to: {destination_path}")
+            return stored_name
+        except FileExistsError:
+            return stored_name
+        except OSError:
+            pass  # different filesystem / no hardlink support: fall back to copying
+
+    # Copy under a temp name and rename, so a crash never leaves a partial file under the hash name.
+    # The temp name is unique per call: archive threads can be storing the same image at once
+    fd, tmp_path = tempfile.mkstemp(prefix=f"{stored_name}.", suffix=".tmp", dir=destination_folder)
+    os.close(fd)
+    try:
+        # shutil.copyfile copies in-kernel where the OS allows it (sendfile on Linux, fcopyfile on macOS)
+        shutil.copyfile(image_path, tmp_path)
+        shutil.copymode(image_path, tmp_path)  # mkstemp creates it owner-only
+        try:
+            os.replace(tmp_path, destination_path)
+        except OSError:
+            if not os.path.exists(destination_path):
+                raise
+            # Another thread stored the same content first (Windows won't replace a file in use)
+            logging.info(f"🖼️ Duplicate image, already archived as: {destination_path}")
+            return stored_name
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    logging.info(f"🖼️ Image saved to: {destination_path}")
+    return stored_name
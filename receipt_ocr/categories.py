@@ -0,0 +1,120 @@
+import json
+import logging
+import os
+import re
+from collections import defaultdict
+
+from .corrections import build_trie_pattern
+
+DEFAULT_CATEGORY = "Expense"
+
+
+def vendor_key(vendor):
+    return " ".join(str(vendor).upper().split())
+
+
+class CategoryClassifier:
+    """Category from the matched vendor when it is known, else from one weighted pass over all keywords.
+
+    Keywords match case-insensitively at the start of a word ("drug" still finds "DRUGSTORE"); each
+    distinct keyword found adds its category's weight, and the highest total wins (ties: table order).
+    The vendor -> category table starts from the known stores whose own name contains a keyword
+    ("Starbucks Coffee" -> Meals) and can be extended by a JSON file, hot-reloaded like corrections.json.
+    """
+
+    def __init__(self, keywords, weights=None, stores=(), path=None, default=DEFAULT_CATEGORY):
+        self.categories = list(keywords)
+        self.weights = {category: (weights or {}).get(category, 1.0) for category in self.categories}
+        self.default = default
+        self.index = defaultdict(list)  # lowercased keyword -> categories
+        for category, words in keywords.items():
+            for word in words:
+                if category not in self.index[word.lower()]:
+                    self.index[word.lower()].append(category)
+        self.pattern = None
+        if self.index:
+            self.pattern = re.compile(r'(?<!\w)(?:' + build_trie_pattern(self.index) + ')', re.IGNORECASE)
+        self.defaults = {}
+        for store in stores:
+            category = self.from_keywords(store)
+            if category:
+                self.defaults.setdefault(vendor_key(store), category)
+        self.vendors = dict(self.defaults)
+        self.path = path
+        self._mtime = None
+        self.reload_if_changed()
+
+    def reload_if_changed(self):
+        if not self.path:
+            return False
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime == self._mtime:
+            return False
+
+        self._mtime = mtime
+        vendors = dict(self.defaults)
+        if mtime is not None:
+            try:
+                with open(self.path, encoding='utf-8') as f:
+                    vendors.update((vendor_key(vendor), category) for vendor, category in json.load(f).items())
+            except (OSError, ValueError, AttributeError) as e:
+                logging.error(f"❌ Could not load vendor categories from {self.path}: {e}")
+                return False
+        self.vendors = vendors
+        logging.info(f"🔁 Loaded {len(self.vendors)} vendor categories")
+        return True
+
+    def from_keywords(self, text):
+        # -> best-scoring category, or None when no keyword occurs
+        if self.pattern is None:
+            return None
+        scores = defaultdict(float)
+        for word in {match.group(0).lower() for match in self.pattern.finditer(text)}:
+            for category in self.index[word]:
+                scores[category] += self.weights[category]
+        if not scores:
+            return None
+        return max(self.categories, key=lambda category: (scores.get(category, 0), -self.categories.index(category)))
+
+    def classify(self, text, vendor=None):
+        # -> (category, source) with source "vendor", "keywords" or "default"
+        self.reload_if_changed()
+        if vendor:
+            category = self.vendors.get(vendor_key(vendor))
+            if category:
+                return category, "vendor"
+        category = self.from_keywords(text)
+        if category:
+            return category, "keywords"
+        return self.default, "default"
+
+    def __len__(self):
+        return len(self.vendors)
+
+
+def bootstrap_vendor_categories(conn, min_count=3, min_share=0.6, default=DEFAULT_CATEGORY):
+    # -> {vendor: category} from past scanned_receipts rows: the category a vendor was filed under in at
+    # least min_count rows and min_share of its categorized rows. Categories fixed by hand count too;
+    # the fallback category says nothing about the vendor and is left out.
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT vendor, category, COUNT(*) FROM scanned_receipts "
+        "WHERE vendor IS NOT NULL AND vendor <> '' AND category IS NOT NULL AND category <> '' "
+        "GROUP BY vendor, category"
+    )
+    counts = defaultdict(dict)
+    for vendor, category, count in cursor.fetchall():
+        if category != default:
+            by_category = counts[vendor_key(vendor)]
+            by_category[category] = by_category.get(category, 0) + count
+    cursor.close()
+
+    table = {}
+    for vendor, by_category in counts.items():
+        category, count = max(by_category.items(), key=lambda item: item[1])
+        if count >= min_count and count / sum(by_category.values()) >= min_share:
+            table[vendor] = category
+    return table
@@ -0,0 +1,160 @@
+import argparse
+import json
+import logging
+import os
+
+# Nothing heavy at module level: --help and `config` must not pay for OpenCV/Tesseract.
+# Options that change pipeline settings are passed on as environment variables before
+# receipt_ocr.config is first imported, so pool workers started later see them too.
+
+
+def build_parser():
+    from .ocr_backends import OCR_PROFILES  # no heavy imports in there
+
+    settings = argparse.ArgumentParser(add_help=False)
+    settings.add_argument("--extraction", choices=("rules", "legacy", "final"), help="field extraction flavour (OCR_EXTRACTION)")
+    settings.add_argument("--backend", choices=("auto", "tesserocr", "pytesseract"), help="OCR engine (OCR_BACKEND)")
+    settings.add_argument("--profile", choices=sorted(OCR_PROFILES), help="Tesseract settings profile (OCR_PROFILE)")
+    settings.add_argument("--preprocess-mode", choices=("full", "normalized"), help="PREPROCESS_MODE")
+    settings.add_argument("--crop", action="store_true", help="crop to the receipt outline first (RECEIPT_CROP=1)")
+    settings.add_argument("--cascade", action="store_true",
+                          help="OCR header/footer strips first, full page only when unsure (OCR_CASCADE=1)")
+    settings.add_argument("--tiles", action="store_true",
+                          help="OCR tall receipts as overlapping strips in parallel threads (OCR_TILES=1)")
+    settings.add_argument("--adaptive", action="store_true",
+                          help="retry low-confidence images with other binarizations (ADAPTIVE_PREPROCESS=1)")
+    settings.add_argument("--dedup", action="store_true",
+                          help="flag near-duplicates of earlier receipts before OCR (DEDUP=1)")
+    settings.add_argument("--skip-duplicates", action="store_true",
+                          help="don't OCR or save near-duplicates at all (DEDUP=1 DEDUP_SKIP=1)")
+    settings.add_argument("--no-cache", action="store_true", help="bypass the OCR result cache")
+
+    parser = argparse.ArgumentParser(prog="receipt_ocr", description="OCR receipt images into structured records")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    scan = commands.add_parser("scan", parents=[settings], help="OCR every receipt image in a folder")
+    scan.add_argument("folder", nargs="?", help="defaults to SCAN_FOLDER")
+    scan.add_argument("--workers", type=int, help="OCR worker processes (OCR_WORKERS)")
+    scan.add_argument("--full", action="store_true", help="ignore the manifest and rescan every image")
+    scan.add_argument("--watch", action="store_true", help="keep polling the folder for new images")
+    scan.add_argument("--interval", type=float, default=5.0, help="seconds between polls in --watch mode")
+    scan.add_argument("--sink", nargs="+", choices=("db", "jsonl", "csv", "parquet"),
+                      help="where results go, e.g. --sink db parquet (RESULT_SINKS)")
+    scan.add_argument("--results-dir", help="folder for the jsonl/csv/parquet sinks (RESULTS_DIR)")
+    scan.add_argument("--verbose", action="store_true", help="print OCR text and extracted fields per receipt")
+
+    ocr = commands.add_parser("ocr", parents=[settings], help="OCR one image and print the result as JSON (nothing is saved)")
+    ocr.add_argument("image")
+
+    commands.add_parser("config", parents=[settings], help="print the effective settings as JSON")
+    commands.add_parser("cache-stats", help="print OCR cache statistics")
+
+    bootstrap = commands.add_parser("bootstrap-categories",
+                                    help="learn vendor -> category from past receipts into VENDOR_CATEGORIES")
+    bootstrap.add_argument("--min-count", type=int, default=3, help="receipts a vendor needs in its category")
+    bootstrap.add_argument("--min-share", type=float, default=0.6, help="share of the vendor's receipts in it")
+    bootstrap.add_argument("--dry-run", action="store_true", help="print the table instead of writing it")
+    return parser
+
+
+def apply_settings(args):
+    overrides = {
+        "OCR_EXTRACTION": getattr(args, "extraction", None),
+        "OCR_BACKEND": getattr(args, "backend", None),
+        "OCR_PROFILE": getattr(args, "profile", None),
+        "PREPROCESS_MODE": getattr(args, "preprocess_mode", None),
+        "RECEIPT_CROP": "1" if getattr(args, "crop", False) else None,
+        "OCR_CASCADE": "1" if getattr(args, "cascade", False) else None,
+        "OCR_TILES": "1" if getattr(args, "tiles", False) else None,
+        "ADAPTIVE_PREPROCESS": "1" if getattr(args, "adaptive", False) else None,
+        "DEDUP": "1" if getattr(args, "dedup", False) or getattr(args, "skip_duplicates", False) else None,
+        "DEDUP_SKIP": "1" if getattr(args, "skip_duplicates", False) else None,
+        "OCR_CACHE_PATH": "" if getattr(args, "no_cache", False) else None,
+        "RESULT_SINKS": ",".join(args.sink) if getattr(args, "sink", None) else None,
+        "RESULTS_DIR": getattr(args, "results_dir", None),
+        "OCR_VERBOSE": "1" if getattr(args, "verbose", False) else None,
+    }
+    os.environ.update({name: value for name, value in overrides.items() if value is not None})
+
+
+def run_scan(args):
+    from . import config, pipeline
+    from .manifest import ScanManifest
+
+    folder = args.folder or config.folder_path
+    workers = args.workers or config.workers
+    manifest = None if args.full else ScanManifest(config.manifest_path)
+    if args.watch:
+        pipeline.watch_folder(folder, manifest or ScanManifest(config.manifest_path), workers, args.interval)
+        return 0
+    errors = pipeline.scan_folder(folder, workers, manifest=manifest)
+    return 1 if errors else 0
+
+
+def run_ocr(args):
+    from . import pipeline
+
+    try:
+        text, info, ocr_confidence, quality_flag = pipeline.ocr_with_tesseract(args.image)
+    except pipeline.UnreadableImageError as e:
+        print(json.dumps({"error": str(e)}, indent=2))
+        return 1
+    info.pop(pipeline.FINGERPRINT_KEY, None)  # nothing is saved here, so the image never becomes a dedup reference
+    print(json.dumps({"fields": info, "ocr_confidence": ocr_confidence, "quality_flag": quality_flag, "raw_text": text},
+                     indent=2, default=str))
+    return 0 if text or info else 1
+
+
+def run_config(args):
+    from . import config
+
+    print(json.dumps(config.as_dict(), indent=2))
+    return 0
+
+
+def run_cache_stats(args):
+    from . import config
+    from .ocr_cache import OCRCache
+
+    if not config.ocr_cache_path:
+        print("OCR cache is disabled (OCR_CACHE_PATH is empty)")
+        return 0
+    print(json.dumps(OCRCache(config.ocr_cache_path, config.ocr_cache_max_bytes).stats(), indent=2))
+    return 0
+
+
+def run_bootstrap_categories(args):
+    from . import config
+    from .categories import bootstrap_vendor_categories
+    from .db_writer import make_backend
+
+    backend = make_backend()
+    conn = backend.connect()
+    try:
+        learned = bootstrap_vendor_categories(conn, args.min_count, args.min_share)
+    finally:
+        backend.release(conn)
+
+    table = {}
+    if os.path.exists(config.vendor_categories_file):
+        with open(config.vendor_categories_file, encoding="utf-8") as f:
+            table = json.load(f)
+    changed = {vendor: category for vendor, category in learned.items() if table.get(vendor) != category}
+    table.update(learned)
+    if args.dry_run:
+        print(json.dumps(table, indent=2, sort_keys=True))
+        return 0
+    with open(config.vendor_categories_file, "w", encoding="utf-8") as f:
+        json.dump(table, f, indent=2, sort_keys=True)
+    logging.info(f"🏷️ {len(learned)} vendor categories learned ({len(changed)} new/changed), "
+                 f"{len(table)} in {config.vendor_categories_file}")
+    return 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    apply_settings(args)
+    logging.basicConfig(level=logging.INFO)
+    handler = {"scan": run_scan, "ocr": run_ocr, "config": run_config, "cache-stats": run_cache_stats,
+               "bootstrap-categories": run_bootstrap_categories}[args.command]
+    return handler(args)
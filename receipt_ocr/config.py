@@ -0,0 +1,104 @@
+import os
+
+# Local state (corrections.json, OCR cache, scan manifest) stays at the repo root, next to the scripts
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# "rules":  weighted total/date rules from extraction_rules.json, quality from field confidences (finalfinal.py)
+# "legacy": ordered total regexes, quality from Tesseract word confidences (teseract.py)
+# "final":  final.py's own total regexes, date formats, corrections and store list; no quality, and only
+#           date/vendor/amount/category/image_path are inserted. No cascade or adaptive retries (nothing to score)
+EXTRACTIONS = ("rules", "legacy", "final")
+
+# 🧾 Field extraction flavour
+extraction = os.environ.get("OCR_EXTRACTION", "rules")
+# 📁 Folder path
+folder_path = os.environ.get("SCAN_FOLDER", r"C:\Users\CEO Ivo John Barroba\Downloads\dataset\scanned")
+# ⚙️ Worker processes for OCR (1 = serial)
+workers = int(os.environ.get("OCR_WORKERS", os.cpu_count() or 1))
+# 🗂️ Processed-file manifest for incremental scans
+manifest_path = os.environ.get("SCAN_MANIFEST_PATH", os.path.join(BASE_DIR, "scan_manifest.sqlite3"))
+# 🔊 Print full OCR text + extracted fields per receipt (off by default: it's a real cost at volume)
+verbose = os.environ.get("OCR_VERBOSE", "0") == "1"
+
+# ✏️ corrections.json overrides/extends the built-in correction tables and is picked up without a restart
+corrections_file = os.environ.get("CORRECTIONS_FILE", os.path.join(BASE_DIR, "corrections.json"))
+# 🏷️ Vendor -> category table, grown from past receipts by `python -m receipt_ocr bootstrap-categories`
+vendor_categories_file = os.environ.get("VENDOR_CATEGORIES", os.path.join(BASE_DIR, "vendor_categories.json"))
+# 📐 Total/date rules for the "rules" extraction
+extraction_rules_file = os.environ.get("EXTRACTION_RULES", os.path.join(PACKAGE_DIR, "extraction_rules.json"))
+
+# 🔤 OCR engine: "tesserocr" (in-process, model loaded once per worker), "pytesseract" (tesseract binary
+# per call) or "auto" (tesserocr when installed, else pytesseract)
+ocr_backend = os.environ.get("OCR_BACKEND", "auto")
+ocr_lang = os.environ.get("OCR_LANG", "eng")
+# 🎚️ Tesseract settings profile (default/fast/balanced/accurate, see ocr_backends.OCR_PROFILES); per batch/request overrides
+ocr_profile = os.environ.get("OCR_PROFILE", "default")
+
+# 🪜 Cascade: OCR only a header strip (vendor) and a footer strip (total/date) of long receipts first and
+# fall back to the full page when any field confidence from the strips is below OCR_CASCADE_MIN_CONFIDENCE
+ocr_cascade = os.environ.get("OCR_CASCADE", "0") == "1"
+cascade_header_ratio = float(os.environ.get("OCR_CASCADE_HEADER", 0.15))
+cascade_footer_ratio = float(os.environ.get("OCR_CASCADE_FOOTER", 0.3))
+cascade_min_aspect = float(os.environ.get("OCR_CASCADE_MIN_ASPECT", 1.5))
+cascade_min_confidence = float(os.environ.get("OCR_CASCADE_MIN_CONFIDENCE", 70))
+# 🧱 Tiling: OCR very tall receipts as overlapping horizontal strips on OCR_TILE_WORKERS threads (one engine
+# each) and stitch the lines back together. Meant for single-image latency: with OCR_WORKERS > 1 the cores
+# are already busy, and tesseract's own OpenMP threads are best capped with OMP_THREAD_LIMIT=1.
+ocr_tiles = os.environ.get("OCR_TILES", "0") == "1"
+ocr_tile_height = int(os.environ.get("OCR_TILE_HEIGHT", 1500))
+ocr_tile_overlap = int(os.environ.get("OCR_TILE_OVERLAP", 150))
+ocr_tile_workers = int(os.environ.get("OCR_TILE_WORKERS", os.cpu_count() or 1))
+# 🔁 Adaptive preprocessing: when the first (Otsu) pass scores below ADAPTIVE_MIN_CONFIDENCE (field confidence
+# for "rules", mean word confidence for "legacy"), retry with up to ADAPTIVE_RETRIES other binarizations and
+# keep the best-scoring result
+adaptive_preprocess = os.environ.get("ADAPTIVE_PREPROCESS", "0") == "1"
+adaptive_min_confidence = float(os.environ.get("ADAPTIVE_MIN_CONFIDENCE", 60))
+adaptive_retries = int(os.environ.get("ADAPTIVE_RETRIES", 2))
+adaptive_methods = os.environ.get("ADAPTIVE_METHODS", "adaptive,clahe,morph")
+
+# 👯 Near-duplicates: a perceptual hash (DEDUP_HASH: phash/dhash) of every receipt is looked up among all saved
+# ones before OCR; an earlier receipt within DEDUP_DISTANCE bits (of 64) whose detail hash also agrees (at most
+# DEDUP_MISMATCH of its 1024 bits differ) flags the image as fields['duplicate_of'] it, and with DEDUP_SKIP=1
+# it is not saved (nor OCR'd, unless the earlier copy was still in flight in the same scan). Flagged rows keep duplicate_of/_distance/_mismatch in the result sinks and the
+# SQLite table (MySQL: see db_writer.DUPLICATE_COLUMNS). Tune both with benchmarks/bench_dedup.py --rendered
+dedup = os.environ.get("DEDUP", "0") == "1"
+dedup_path = os.environ.get("DEDUP_PATH", os.path.join(BASE_DIR, "receipt_hashes.sqlite3"))
+dedup_hash = os.environ.get("DEDUP_HASH", "phash")
+dedup_distance = int(os.environ.get("DEDUP_DISTANCE", 6))
+dedup_mismatch = float(os.environ.get("DEDUP_MISMATCH", 0.115))
+dedup_skip = os.environ.get("DEDUP_SKIP", "0") == "1"
+
+# 🗃️ OCR result cache (set OCR_CACHE_PATH="" to disable)
+ocr_cache_path = os.environ.get("OCR_CACHE_PATH", os.path.join(BASE_DIR, "ocr_cache.sqlite3"))
+ocr_cache_max_bytes = int(os.environ.get("OCR_CACHE_MAX_MB", 512)) * 1024 * 1024
+
+# 🖼️ Preprocessing: "full" (original full-resolution path) or "normalized" (reduced decode + text-height resample)
+preprocess_mode = os.environ.get("PREPROCESS_MODE", "full")
+target_text_height = int(os.environ.get("TARGET_TEXT_HEIGHT", 28))
+# ✂️ Crop + perspective-correct to the receipt outline before thresholding
+receipt_crop = os.environ.get("RECEIPT_CROP", "0") == "1"
+
+# 🖼️ XAMPP uploads folder; images are stored under their content hash, hardlinked when possible
+archive_folder = os.environ.get("ARCHIVE_FOLDER", r"F:\xampp\htdocs\csk\uploads\scanned")
+archive_hardlink = os.environ.get("ARCHIVE_HARDLINK", "1") == "1"
+
+# 🚰 Streaming scan: threads for the read and archive stages, and the bound on each stage's queue
+scan_io_threads = int(os.environ.get("SCAN_IO_THREADS", 4))
+scan_queue_size = int(os.environ.get("SCAN_QUEUE_SIZE", 16))
+
+# 📤 Where extracted receipts go, comma-separated: "db" (the batched inserts below), "jsonl" and "csv"
+# (appended to RESULTS_DIR/receipts.*) and "parquet" (a file per run, one row group per SINK_BATCH_SIZE rows)
+result_sinks = os.environ.get("RESULT_SINKS", "db")
+results_dir = os.environ.get("RESULTS_DIR", os.path.join(BASE_DIR, "results"))
+sink_batch_size = int(os.environ.get("SINK_BATCH_SIZE", 1000))
+
+# 💾 Batched DB inserts (backend/connection settings are read by db_writer.make_backend)
+db_batch_size = int(os.environ.get("DB_BATCH_SIZE", 50))
+db_flush_interval = float(os.environ.get("DB_FLUSH_INTERVAL", 5))
+
+
+def as_dict():
+    # Effective settings, for `python -m receipt_ocr config`
+    return {name: value for name, value in globals().items()
+            if name.islower() and not name.startswith("_") and isinstance(value, (str, int, float, bool))}
@@ -0,0 +1,79 @@
+import json
+import logging
+import os
+import re
+
+
+def build_trie_pattern(words):
+    # Fold the words into a character trie and render it as one regex, so the
+    # matcher branches on the next character instead of trying every entry.
+    # Optional groups are greedy, so the longest entry wins ("Net Tota!" over "Tota!").
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = True
+
+    def render(node):
+        alts = [re.escape(ch) + render(child) for ch, child in sorted(node.items()) if ch]
+        if not alts:
+            return ''
+        if len(alts) == 1 and '' not in node:
+            return alts[0]
+        group = '(?:' + '|'.join(alts) + ')'
+        return group + '?' if '' in node else group
+
+    return render(trie)
+
+
+class CorrectionEngine:
+    """Applies OCR corrections in a single regex pass, hot-reloading an optional JSON file."""
+
+    def __init__(self, corrections=None, path=None):
+        self.defaults = dict(corrections or {})
+        self.path = path
+        self._mtime = None
+        self._compiled = self._compile(self.defaults)
+        self.reload_if_changed()
+
+    def _compile(self, corrections):
+        # Matching is case-insensitive, so key the replacements on the lowercased entry
+        lookup = {wrong.lower(): right for wrong, right in corrections.items() if wrong}
+        if not lookup:
+            return None, lookup
+        pattern = re.compile(r'(?<!\w)(?:' + build_trie_pattern(lookup) + r')(?!\w)', re.IGNORECASE)
+        return pattern, lookup
+
+    def reload_if_changed(self):
+        if not self.path:
+            return False
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime == self._mtime:
+            return False
+
+        self._mtime = mtime
+        corrections = dict(self.defaults)
+        if mtime is not None:
+            try:
+                with open(self.path, encoding='utf-8') as f:
+                    corrections.update(json.load(f))
+            except (OSError, ValueError) as e:
+                logging.error(f"❌ Could not load corrections from {self.path}: {e}")
+                return False
+        self._compiled = self._compile(corrections)
+        logging.info(f"🔁 Loaded {len(self._compiled[1])} corrections")
+        return True
+
+    def apply(self, text):
+        self.reload_if_changed()
+        pattern, lookup = self._compiled
+        if pattern is None:
+            return text
+        return pattern.sub(lambda m: lookup[m.group(0).lower()], text)
+
+    def __len__(self):
+        return len(self._compiled[1])
@@ -0,0 +1,249 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+# (column, receipt_data key) pairs, matching the scanned_receipts table
+RECEIPT_COLUMNS = [
+    ("receipt_date", "date"),
+    ("vendor", "vendor"),
+    ("amount", "total"),
+    ("category", "category"),
+    ("image_path", "image_path"),
+    ("raw_text", "raw_text"),
+    ("vendor_confidence", "vendor_confidence"),
+    ("total_confidence", "total_confidence"),
+    ("date_confidence", "date_confidence"),
+    ("confidence_score", "confidence_score"),
+    ("quality_flag", "quality"),
+]
+
+# final.py's insert: the columns its scanned_receipts table had
+FINAL_RECEIPT_COLUMNS = RECEIPT_COLUMNS[:5]
+
+# The near-duplicate flag (DEDUP=1). The SQLite table has these; a MySQL scanned_receipts table gets them with
+#   ALTER TABLE scanned_receipts ADD duplicate_of VARCHAR(255), ADD duplicate_distance INT, ADD duplicate_mismatch FLOAT
+# and then DB_DUPLICATE_COLUMNS=1 writes them there too
+DUPLICATE_COLUMNS = [
+    ("duplicate_of", "duplicate_of"),
+    ("duplicate_distance", "duplicate_distance"),
+    ("duplicate_mismatch", "duplicate_mismatch"),
+]
+
+SQLITE_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS scanned_receipts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        receipt_date TEXT,
+        vendor TEXT,
+        amount REAL,
+        category TEXT,
+        image_path TEXT,
+        raw_text TEXT,
+        vendor_confidence REAL,
+        total_confidence REAL,
+        date_confidence REAL,
+        confidence_score REAL,
+        quality_flag TEXT,
+        duplicate_of TEXT,
+        duplicate_distance INTEGER,
+        duplicate_mismatch REAL
+    )
+'''
+# Added since the first SQLite tables were created: (column, type) for ALTER TABLE on an older file
+SQLITE_ADDED_COLUMNS = [("duplicate_of", "TEXT"), ("duplicate_distance", "INTEGER"), ("duplicate_mismatch", "REAL")]
+
+
+class MySQLBackend:
+    placeholder = "%s"
+    duplicate_columns = False  # see DUPLICATE_COLUMNS
+    # Server gone away / lost connection / can't connect / lock wait timeout / deadlock
+    transient_errnos = {2003, 2006, 2013, 1205, 1213}
+
+    def __init__(self, pool_size=5, **conn_args):
+        import mysql.connector
+        import mysql.connector.pooling
+        self.mysql = mysql.connector
+        self.errors = mysql.connector.Error
+        self.pool_size = pool_size
+        self.conn_args = conn_args
+        self._pool = None
+
+    def connect(self):
+        if self._pool is None:
+            self._pool = self.mysql.pooling.MySQLConnectionPool(
+                pool_name="scanned_receipts", pool_size=self.pool_size, **self.conn_args
+            )
+        return self._pool.get_connection()
+
+    def release(self, conn):
+        conn.close()  # returns the connection to the pool
+
+    def is_transient(self, err):
+        return getattr(err, "errno", None) in self.transient_errnos or isinstance(
+            err, (self.mysql.OperationalError, self.mysql.InterfaceError)
+        )
+
+
+class SQLiteBackend:
+    placeholder = "?"
+    errors = sqlite3.Error
+    duplicate_columns = True
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute(SQLITE_SCHEMA)
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(scanned_receipts)")}
+        for column, column_type in SQLITE_ADDED_COLUMNS:
+            if column not in existing:
+                self._conn.execute(f"ALTER TABLE scanned_receipts ADD COLUMN {column} {column_type}")
+        self._conn.commit()
+
+    def connect(self):
+        return self._conn
+
+    def release(self, conn):
+        pass
+
+    def is_transient(self, err):
+        return isinstance(err, sqlite3.OperationalError)  # e.g. "database is locked"
+
+
+def make_backend():
+    # DB_BACKEND=sqlite (+ DB_PATH) for local runs/tests, MySQL otherwise
+    if os.environ.get("DB_BACKEND", "mysql").lower() == "sqlite":
+        return SQLiteBackend(os.environ.get("DB_PATH", "receipts.sqlite3"))
+    backend = MySQLBackend(
+        pool_size=int(os.environ.get("DB_POOL_SIZE", 5)),
+        host=os.environ.get("DB_HOST", "localhost"),
+        user=os.environ.get("DB_USER", "admin"),
+        password=os.environ.get("DB_PASSWORD", "123"),
+        database=os.environ.get("DB_NAME", "csk"),
+    )
+    backend.duplicate_columns = os.environ.get("DB_DUPLICATE_COLUMNS", "0") == "1"
+    return backend
+
+
+class BufferedWriter:
+    """Buffers rows and writes them out in bulk every batch_size rows or flush_interval seconds.
+
+    Shared by ReceiptWriter and the file sinks (sinks.py): a subclass says how receipt data becomes
+    a row (_row) and how a batch is written (_write, all or nothing, returning how many rows landed).
+    A row's on_saved callback runs once its batch is written; its on_failed callback runs instead when
+    the batch was given up on.
+    """
+
+    name = None  # as a result sink (RESULT_SINKS)
+
+    def __init__(self, batch_size, flush_interval):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.failed = 0
+        self._rows = []
+        self._lock = threading.Lock()        # guards the buffer: add() never waits for a write
+        self._write_lock = threading.Lock()  # one batch in flight at a time, in the order they were taken
+        self._stop = threading.Event()
+        self._timer = None
+
+    def _row(self, receipt_data):
+        raise NotImplementedError
+
+    def _write(self, rows):
+        raise NotImplementedError
+
+    def add(self, receipt_data, on_saved=None, on_failed=None):
+        row = self._row(receipt_data)
+        with self._lock:
+            self._rows.append((row, on_saved, on_failed))
+            full = len(self._rows) >= self.batch_size
+            start_timer = self._timer is None and self.flush_interval
+            if start_timer:
+                self._timer = threading.Thread(target=self._run_timer, name=f"{self.name}-writer-flush", daemon=True)
+        if start_timer:
+            self._timer.start()
+        if full:
+            self.flush()
+
+    def _run_timer(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        with self._write_lock:
+            with self._lock:
+                buffered, self._rows = self._rows, []
+            if not buffered:
+                return 0
+            rows = [row for row, _, _ in buffered]
+            written = self._write(rows)  # retries and backoff happen here, outside the buffer lock
+            self.written += written
+            self.failed += len(rows) - written
+        outcome = "on_saved" if written == len(rows) else "on_failed"
+        for _, on_saved, on_failed in buffered:
+            callback = on_saved if outcome == "on_saved" else on_failed
+            if callback is not None:
+                try:
+                    callback()
+                except Exception as e:
+                    logging.warning(f"⚠️ {self.name} {outcome} callback failed: {e}")
+        return written
+
+    def end_run(self):
+        # A scan finished: write out its rows (file sinks also finish their file here)
+        return self.flush()
+
+    def close(self):
+        self._stop.set()
+        self.flush()
+
+
+class ReceiptWriter(BufferedWriter):
+    """Buffers receipt rows and inserts them with executemany every batch_size rows or flush_interval seconds."""
+
+    name = "db"
+
+    def __init__(self, backend, columns=None, table="scanned_receipts",
+                 batch_size=50, flush_interval=5.0, retries=3, retry_delay=0.5):
+        super().__init__(batch_size, flush_interval)
+        if columns is None:
+            columns = RECEIPT_COLUMNS + (DUPLICATE_COLUMNS if backend.duplicate_columns else [])
+        self.backend = backend
+        self.columns = columns
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.sql = "INSERT INTO {} ({}) VALUES ({})".format(
+            table, ", ".join(col for col, _ in columns), ", ".join([backend.placeholder] * len(columns))
+        )
+
+    def _row(self, receipt_data):
+        return tuple(receipt_data.get(key) for _, key in self.columns)
+
+    def _write(self, rows):
+        for attempt in range(self.retries + 1):
+            conn = None
+            try:
+                conn = self.backend.connect()
+                cursor = conn.cursor()
+                cursor.executemany(self.sql, rows)
+                conn.commit()
+                cursor.close()
+                logging.info(f"✅ {len(rows)} receipt(s) saved to database.")
+                return len(rows)
+            except self.backend.errors as err:
+                if conn is not None:
+                    try:
+                        conn.rollback()
+                    except self.backend.errors:
+                        pass
+                if attempt < self.retries and self.backend.is_transient(err):
+                    logging.warning(f"⚠️ DB write failed ({err}), retrying ({attempt + 1}/{self.retries})")
+                    time.sleep(self.retry_delay * 2 ** attempt)
+                    continue
+                logging.error(f"❌ DB Error: {err} ({len(rows)} receipt(s) not saved)")
+                return 0
+            finally:
+                if conn is not None:
+                    self.backend.release(conn)
+        return 0
@@ -0,0 +1,245 @@
+import itertools
+import sqlite3
+import threading
+import time
+
+HASH_BITS = 64
+
+DETAIL_SIZE = (64, 128)  # detail hash thumbnail (width, height): receipts are long, so twice the rows
+DETAIL_COEFFS = 32       # the DETAIL_COEFFS x DETAIL_COEFFS lowest frequencies of that thumbnail
+DETAIL_BITS = DETAIL_COEFFS * DETAIL_COEFFS
+DETAIL_WORDS = DETAIL_BITS // 64
+
+
+def bits_to_int(bits):
+    value = 0
+    for bit in bits:
+        value = (value << 1) | int(bit)
+    return value
+
+
+def dhash(gray):
+    # Difference hash: is each pixel brighter than its right neighbour, on a 9x8 thumbnail
+    import cv2
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    return bits_to_int((small[:, 1:] > small[:, :-1]).ravel())
+
+
+def phash(gray):
+    # DCT hash: the 8x8 lowest frequencies of a 32x32 thumbnail against their median (DC term left out).
+    # Survives rescaling, recompression and lighting changes better than dhash.
+    import cv2
+    import numpy as np
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8].ravel()
+    return bits_to_int(low > np.median(low[1:]))
+
+
+PERCEPTUAL_HASHES = {"phash": phash, "dhash": dhash}
+
+
+def detail_hash(gray):
+    # -> DETAIL_BITS bits (bytes) built like phash, with 16 times the frequencies. The 64-bit hashes only see
+    # the paper and the layout, so receipts from the same till hash alike; this one also sees the lines of
+    # text that tell their items, amounts and dates apart, while a re-photo keeps ~90% of its bits.
+    import cv2
+    import numpy as np
+    small = cv2.resize(gray, DETAIL_SIZE, interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:DETAIL_COEFFS, :DETAIL_COEFFS].ravel()
+    return np.packbits(low > np.median(low[1:])).tobytes()
+
+
+def detail_mismatch(a, b):
+    # -> share of the detail hash bits that differ: up to ~0.10 for re-photos of one receipt, ~0.125 and up
+    # for different receipts from the same till (benchmarks/bench_dedup.py --rendered 1000)
+    return hamming(int.from_bytes(a, "big"), int.from_bytes(b, "big")) / DETAIL_BITS
+
+
+def fingerprint(image_bytes, method="phash"):
+    # -> (64-bit perceptual hash, detail hash), or None when the bytes don't decode. Works on a reduced
+    # decode (1/4 scale for phone photos) cropped to the receipt outline, so a re-photo with a different
+    # background or framing, or a crop of the same photo, lands close to the original.
+    from .preprocess import crop_receipt, decode_gray
+    gray = decode_gray(image_bytes, min_side=800)
+    if gray is None:
+        return None
+    receipt = crop_receipt(gray)
+    return PERCEPTUAL_HASHES[method](receipt), detail_hash(receipt)
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+def popcount(words):
+    # Bits set in each uint64 of an array (np.bitwise_count needs numpy 2)
+    import numpy as np
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words)
+    return np.unpackbits(words[..., None].view(np.uint8), axis=-1).sum(axis=-1)
+
+
+class HammingIndex:
+    """Stored hashes, each with its detail hash, searched with one vectorized XOR + popcount pass.
+
+    Receipts from the same till hash alike, so an index that files hashes under their 16-bit chunks
+    (multi-index hashing, a BK-tree) walks thousands of same-till entries in Python for every
+    lookup of a busy till. A scan over a numpy array costs the same however the hashes cluster:
+    0.4 ms median, 0.7 ms 99th percentile at 300k receipts (benchmarks/bench_dedup.py). The detail
+    hashes are only compared for the receipts whose hash is close.
+    """
+
+    def __init__(self, capacity=1024):
+        import numpy as np
+        self.hashes = np.zeros(capacity, np.uint64)
+        self.details = np.zeros((capacity, DETAIL_WORDS), np.uint64)
+        self.values = []
+
+    def add(self, value_hash, detail, value):
+        import numpy as np
+        slot = len(self.values)
+        if slot == len(self.hashes):
+            self.hashes = np.concatenate([self.hashes, np.zeros_like(self.hashes)])
+            self.details = np.concatenate([self.details, np.zeros_like(self.details)])
+        self.hashes[slot] = value_hash
+        self.details[slot] = np.frombuffer(detail, np.uint64)
+        self.values.append(value)
+
+    def search(self, value_hash, max_distance, detail=None, max_mismatch=1.0):
+        # -> [(distance, mismatch, value)] of every stored hash within max_distance whose detail hash
+        # differs in at most max_mismatch of its bits, most alike first (mismatch is None without detail)
+        import numpy as np
+        count = len(self.values)
+        distances = popcount(self.hashes[:count] ^ np.uint64(value_hash))
+        slots = np.flatnonzero(distances <= max_distance)
+        if detail is None:
+            return sorted((int(distances[slot]), None, self.values[slot]) for slot in slots)
+        # A busy till can put thousands of receipts within max_distance: take + einsum keep that well under 1 ms
+        differ = np.take(self.details, slots, axis=0)
+        differ ^= np.frombuffer(detail, np.uint64)
+        mismatches = np.einsum("ij->i", popcount(differ), dtype=np.uint16) / DETAIL_BITS
+        keep = mismatches <= max_mismatch
+        found = [(int(distances[slot]), float(mismatch), self.values[slot])
+                 for slot, mismatch in zip(slots[keep], mismatches[keep])]
+        found.sort(key=lambda match: (match[1], match[0]))
+        return found
+
+    def __len__(self):
+        return len(self.values)
+
+
+def to_signed(value_hash):
+    # SQLite integers are signed 64-bit
+    return value_hash - (1 << HASH_BITS) if value_hash >= 1 << (HASH_BITS - 1) else value_hash
+
+
+class DuplicateIndex:
+    """Fingerprints of every saved receipt: kept in SQLite, searched in memory in a HammingIndex.
+
+    A stored receipt is a duplicate candidate when its hash is within max_distance bits, and a
+    duplicate once its detail hash agrees too (detail_mismatch <= max_mismatch): the hash alone
+    can't tell apart receipts from the same till (benchmarks/bench_dedup.py --rendered).
+    Receipts only become references once saved, so a copy is never judged against a receipt whose
+    scan failed. In between, hold() keeps a receipt as pending: lookups see it, and commit() stores
+    it once its row is written or drop() forgets it when the write fails, so two copies in one
+    scan are caught too. Pool workers, scan threads and the API share the file; each process
+    picks up the others' rows before every lookup (pending receipts stay with their process).
+    """
+
+    def __init__(self, path, method="phash"):
+        self.path = path
+        self.method = method
+        self.index = HammingIndex()
+        self.pending = {}  # token -> (hash, detail hash, source) of held receipts
+        self._tokens = itertools.count(1)
+        self._last_id = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS receipt_fingerprints (
+                id INTEGER PRIMARY KEY,
+                method TEXT NOT NULL,
+                hash INTEGER NOT NULL,
+                detail BLOB NOT NULL,
+                source TEXT NOT NULL,
+                added_at REAL NOT NULL
+            )
+        ''')
+        with self._lock:
+            self._refresh()
+
+    def _refresh(self):
+        rows = self.conn.execute(
+            "SELECT id, hash, detail, source FROM receipt_fingerprints WHERE id > ? AND method = ? ORDER BY id",
+            (self._last_id, self.method)
+        ).fetchall()
+        for row_id, value_hash, detail, source in rows:
+            self.index.add(value_hash & ((1 << HASH_BITS) - 1), detail, source)
+            self._last_id = row_id
+
+    def _find(self, value_hash, detail, source, max_distance, max_mismatch):
+        # Caller holds the lock
+        self._refresh()
+        matches = self.index.search(value_hash, max_distance, detail, max_mismatch)
+        for held_hash, held_detail, held_source in self.pending.values():
+            distance = hamming(value_hash, held_hash)
+            if distance <= max_distance:
+                mismatch = detail_mismatch(detail, held_detail)
+                if mismatch <= max_mismatch:
+                    matches.append((distance, mismatch, held_source))
+        matches.sort(key=lambda match: (match[1], match[0]))
+        for distance, mismatch, earlier in matches:
+            if earlier != source or source.startswith("<"):
+                return distance, mismatch, earlier
+        return None
+
+    def find(self, value_hash, detail, source, max_distance, max_mismatch):
+        # -> (distance, mismatch, earlier source) of the most alike saved or held receipt, or None.
+        # A file rescanned under its own path is not its own duplicate ("<upload>" sources have no path).
+        with self._lock:
+            return self._find(value_hash, detail, source, max_distance, max_mismatch)
+
+    def hold(self, value_hash, detail, source, max_distance, max_mismatch):
+        # -> (match, None) like find(), or (None, token) once the receipt is held; both in one step, so
+        # of two copies held at the same time exactly one comes out as the other's duplicate
+        with self._lock:
+            match = self._find(value_hash, detail, source, max_distance, max_mismatch)
+            if match is not None:
+                return match, None
+            token = next(self._tokens)
+            self.pending[token] = (value_hash, detail, source)
+            return None, token
+
+    def drop(self, token):
+        with self._lock:
+            self.pending.pop(token, None)
+
+    def commit(self, token):
+        # A held receipt was saved: store it for good. Inside one write transaction with the refresh,
+        # so _last_id never skips another process's rows
+        with self._lock:
+            value_hash, detail, source = self.pending.pop(token)
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._refresh()
+                cursor = self.conn.execute(
+                    "INSERT INTO receipt_fingerprints (method, hash, detail, source, added_at) VALUES (?, ?, ?, ?, ?)",
+                    (self.method, to_signed(value_hash), detail, source, time.time())
+                )
+                self.index.add(value_hash, detail, source)
+                self._last_id = cursor.lastrowid
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def add(self, value_hash, detail, source):
+        # Hold and commit in one go, for receipts already known to be saved
+        with self._lock:
+            token = next(self._tokens)
+            self.pending[token] = (value_hash, detail, source)
+        self.commit(token)
+
+    def __len__(self):
+        return len(self.index)
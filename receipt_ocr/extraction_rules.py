@@ -0,0 +1,114 @@
+import calendar
+import json
+import re
+from collections import defaultdict
+
+# strptime-equivalent regexes for the directives receipt dates use
+DATE_DIRECTIVES = {
+    'd': r'(?P<d>3[01]|[12]\d|0[1-9]|[1-9]| [1-9])',
+    'm': r'(?P<m>1[0-2]|0[1-9]|[1-9])',
+    'Y': r'(?P<Y>\d\d\d\d)',
+    'y': r'(?P<y>\d\d)',
+}
+
+
+def compile_date_format(fmt):
+    parts = re.split(r'(%.)', fmt)
+    pattern = ''
+    literals = ''
+    for part in parts:
+        if part.startswith('%') and len(part) == 2:
+            if part[1] not in DATE_DIRECTIVES:
+                raise ValueError(f"Unsupported date directive {part} in {fmt!r}")
+            pattern += DATE_DIRECTIVES[part[1]]
+        else:
+            pattern += re.escape(part)
+            literals += part
+    return literals, re.compile(pattern)
+
+
+class ExtractionRules:
+    """Total/date rules from a rules file, compiled once into one matcher per field."""
+
+    def __init__(self, rules):
+        currency = '(?:' + '|'.join(re.escape(c) for c in rules.get('currency_prefixes', [])) + ')'
+        self.total_rules = []
+        alternatives = []
+        for rule in rules['totals']:
+            pattern = rule['pattern'].replace('{currency}', currency)
+            if re.compile(pattern).groups != 1:
+                raise ValueError(f"Total rule {rule.get('name')!r} must have exactly one capture group")
+            self.total_rules.append((rule.get('name'), rule['weight']))
+            alternatives.append(f'(?:{pattern})')
+        # One scan for all total rules: the leading lookahead stops only where some rule matches,
+        # then each rule's optional lookahead captures (whole match, amount) at that position
+        gate = '(?=' + '|'.join(alternatives) + ')'
+        captures = ''.join(f'(?:(?=({alt})))?' for alt in alternatives)
+        self.total_pattern = re.compile(gate + captures, re.IGNORECASE)
+        self.group_offset = len(alternatives)  # the gate's own (unused) groups come first
+        self.fallback_pattern = re.compile(rules['fallback_amount'])
+        self.date_pattern = re.compile(rules['date_pattern'])
+
+        # Date formats bucketed by their separators, tried in file order within a bucket
+        self.date_formats = defaultdict(list)
+        for fmt in rules['date_formats']:
+            literals, compiled = compile_date_format(fmt)
+            self.date_formats[literals].append(compiled)
+
+    def find_totals(self, text):
+        # -> [(amount, weight)] ordered by rule, then by position, exactly like one findall per rule
+        per_rule = [[] for _ in self.total_rules]
+        last_end = [0] * len(self.total_rules)
+        for m in self.total_pattern.finditer(text):
+            for i, (_, weight) in enumerate(self.total_rules):
+                group = self.group_offset + 2 * i + 1
+                start, end = m.span(group)
+                # findall never returns overlapping matches of the same rule
+                if start < 0 or start < last_end[i]:
+                    continue
+                last_end[i] = max(end, start + 1)
+                amount = parse_amount(m.group(group + 1))
+                if amount is not None:
+                    per_rule[i].append((amount, weight))
+        return [total for totals in per_rule for total in totals]
+
+    def find_amounts(self, text):
+        amounts = (parse_amount(a) for a in self.fallback_pattern.findall(text))
+        return [a for a in amounts if a is not None]
+
+    def find_date(self, text):
+        # -> (raw_date, "YYYY-MM-DD" or None), or None when there's no date-like token
+        m = self.date_pattern.search(text)
+        if not m:
+            return None
+        raw_date = m.group(1)
+        return raw_date, self.parse_date(raw_date)
+
+    def parse_date(self, raw_date):
+        separators = re.sub(r'\d', '', raw_date)
+        for compiled in self.date_formats.get(separators, ()):
+            m = compiled.fullmatch(raw_date)
+            if not m:
+                continue
+            parts = m.groupdict()
+            if parts.get('Y'):
+                year = int(parts['Y'])
+            else:
+                year = int(parts['y'])
+                year += 2000 if year <= 68 else 1900  # same pivot as strptime's %y
+            month, day = int(parts['m']), int(parts['d'])
+            if year >= 1 and day <= calendar.monthrange(year, month)[1]:
+                return f"{year:04d}-{month:02d}-{day:02d}"
+        return None
+
+
+def parse_amount(raw):
+    try:
+        return float(raw.replace(',', '').replace('O', '0'))
+    except ValueError:
+        return None
+
+
+def load_rules(path):
+    with open(path, encoding='utf-8') as f:
+        return ExtractionRules(json.load(f))
@@ -0,0 +1,65 @@
+import hashlib
+import sqlite3
+import threading
+import time
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ScanManifest:
+    """Remembers (path, size, mtime, content hash) of processed images so re-scans only touch new/changed files."""
+
+    def __init__(self, path):
+        self.path = path
+        # scan_folder checks files from the listing thread and records them from its write stage
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS processed_files (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                sha256 TEXT NOT NULL,
+                processed_at REAL NOT NULL
+            )
+        ''')
+
+    def is_processed(self, path, st):
+        with self._lock:
+            row = self.conn.execute("SELECT size, mtime_ns, sha256 FROM processed_files WHERE path = ?", (path,)).fetchone()
+        if row is None:
+            return False
+        size, mtime_ns, sha256 = row
+        if (size, mtime_ns) == (st.st_size, st.st_mtime_ns):
+            return True
+        if size != st.st_size:
+            return False
+        # Touched but maybe not modified (copied back, re-synced): only the hash can tell
+        if file_sha256(path) != sha256:
+            return False
+        with self._lock:
+            self.conn.execute("UPDATE processed_files SET mtime_ns = ? WHERE path = ?", (st.st_mtime_ns, path))
+        return True
+
+    def record(self, path, st):
+        sha256 = file_sha256(path)
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO processed_files (path, size, mtime_ns, sha256, processed_at) VALUES (?, ?, ?, ?, ?)",
+                (path, st.st_size, st.st_mtime_ns, sha256, time.time())
+            )
+
+    def forget(self, path):
+        with self._lock:
+            self.conn.execute("DELETE FROM processed_files WHERE path = ?", (path,))
+
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM processed_files").fetchone()[0]
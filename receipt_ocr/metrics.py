@@ -0,0 +1,127 @@
+import functools
+import os
+import threading
+import time
+
+# Upper bounds in seconds; the last bucket catches everything slower
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, float("inf"))
+
+
+class Metrics:
+    """Per-stage latency histograms and labelled counters, cheap enough for the per-receipt hot path.
+
+    Worker processes keep their own registry; scan_image_bytes ships drain() back with each result and
+    the parent merge()s it, so the app's registry covers OCR done in the pool too.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._histograms = {}  # stage -> [bucket counts..., sum, count]
+        self._counters = {}    # (name, label) -> count
+        self._pid = os.getpid()
+
+    def _check_pid(self):
+        # A forked worker starts with a copy of the parent's numbers; drop them so they aren't merged twice
+        if self._pid != os.getpid():
+            self._histograms, self._counters = {}, {}
+            self._pid = os.getpid()
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            self._check_pid()
+            hist = self._histograms.get(stage)
+            if hist is None:
+                hist = self._histograms[stage] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    hist[i] += 1
+                    break
+            hist[-2] += seconds
+            hist[-1] += 1
+
+    def incr(self, name, label="", amount=1):
+        with self._lock:
+            self._check_pid()
+            self._counters[(name, label)] = self._counters.get((name, label), 0) + amount
+
+    def timed(self, stage):
+        # Decorator: record the wall time of every call under `stage`, including calls that raise
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.observe(stage, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "histograms": {stage: list(hist) for stage, hist in self._histograms.items()},
+                "counters": [[name, label, count] for (name, label), count in self._counters.items()],
+            }
+
+    def drain(self):
+        # Snapshot + reset, for shipping a worker's measurements back to the parent process
+        with self._lock:
+            self._check_pid()
+            data = {
+                "histograms": self._histograms,
+                "counters": [[name, label, count] for (name, label), count in self._counters.items()],
+            }
+            self._histograms, self._counters = {}, {}
+        return data
+
+    def merge(self, data):
+        if not data:
+            return
+        with self._lock:
+            for stage, other in data["histograms"].items():
+                hist = self._histograms.setdefault(stage, [0] * (len(self.buckets) + 2))
+                for i, value in enumerate(other):
+                    hist[i] += value
+            for name, label, count in data["counters"]:
+                self._counters[(name, label)] = self._counters.get((name, label), 0) + count
+
+    def to_dict(self):
+        # JSON-friendly view: cumulative bucket counts keyed by upper bound, like the Prometheus format
+        data = self.snapshot()
+        histograms = {}
+        for stage, hist in data["histograms"].items():
+            cumulative, buckets = 0, {}
+            for bound, count in zip(self.buckets, hist):
+                cumulative += count
+                buckets["+Inf" if bound == float("inf") else str(bound)] = cumulative
+            histograms[stage] = {"buckets": buckets, "sum": round(hist[-2], 6), "count": hist[-1]}
+        counters = {}
+        for name, label, count in data["counters"]:
+            counters.setdefault(name, {})[label] = count
+        return {"latency_seconds": histograms, "counters": counters}
+
+    def render_prometheus(self, prefix="ocr_", gauges=None):
+        data = self.to_dict()
+        lines = [f"# TYPE {prefix}stage_latency_seconds histogram"]
+        for stage, hist in sorted(data["latency_seconds"].items()):
+            for bound, count in hist["buckets"].items():
+                lines.append(f'{prefix}stage_latency_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+            lines.append(f'{prefix}stage_latency_seconds_sum{{stage="{stage}"}} {hist["sum"]}')
+            lines.append(f'{prefix}stage_latency_seconds_count{{stage="{stage}"}} {hist["count"]}')
+        for name, labels in sorted(data["counters"].items()):
+            lines.append(f"# TYPE {prefix}{name}_total counter")
+            for label, count in sorted(labels.items()):
+                lines.append(f'{prefix}{name}_total{{label="{label}"}} {count}')
+        for name, value in sorted((gauges or {}).items()):
+            lines.append(f"# TYPE {prefix}{name} gauge")
+            if isinstance(value, dict):  # labelled gauge, e.g. queue depth per stage
+                lines.extend(f'{prefix}{name}{{label="{label}"}} {count}' for label, count in sorted(value.items()))
+            else:
+                lines.append(f"{prefix}{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry
+metrics = Metrics()
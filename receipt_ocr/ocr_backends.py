@@ -0,0 +1,186 @@
+import functools
+import logging
+import os
+import shlex
+import threading
+
+# Letters, digits and the punctuation receipts use in totals, dates, TINs, addresses and store names (MCDONALD'S)
+RECEIPT_WHITELIST = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789.,:;/-&!#%()@*+'"
+
+# psm: 3 = automatic page segmentation, 4 = one column of variable-size text, 6 = one uniform block
+# oem: 1 = LSTM only. tessdata: "fast"/"best" model directory from TESSDATA_FAST_DIR / TESSDATA_BEST_DIR.
+# dpi: resolution hint; whitelist: restrict recognized characters.
+OCR_PROFILES = {
+    "default": {},  # tesseract's own defaults: what every call used before profiles existed
+    "fast": {"psm": 6, "oem": 1, "tessdata": "fast", "dpi": 300, "whitelist": RECEIPT_WHITELIST},
+    "balanced": {"psm": 4, "oem": 1, "dpi": 300},
+    "accurate": {"psm": 4, "oem": 1, "tessdata": "best", "dpi": 300},
+}
+
+TSV_HEADER = "level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\tleft\ttop\twidth\theight\tconf\ttext"
+
+
+def tsv_to_dict(tsv):
+    # Same shape pytesseract's image_to_data(output_type=DICT) returns: numeric columns as int, text as str
+    rows = [row.split("\t") for row in tsv.strip("\n").split("\n") if row]
+    header = rows.pop(0)
+    data = {column: [] for column in header}
+    for row in rows:
+        row += [""] * (len(header) - len(row))
+        for column, value in zip(header[:-1], row):
+            try:
+                value = int(float(value))
+            except ValueError:
+                pass
+            data[column].append(value)
+        data[header[-1]].append(row[len(header) - 1])
+    return data
+
+
+def get_profile(name):
+    try:
+        return OCR_PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown OCR profile {name!r}, expected one of {sorted(OCR_PROFILES)}")
+
+
+def tessdata_dir(variant):
+    # -> model directory for a tessdata variant, or None to use tesseract's default models
+    if not variant:
+        return None
+    path = os.environ.get(f"TESSDATA_{variant.upper()}_DIR") or None
+    if path is None:
+        warn_missing_tessdata(variant)
+    return path
+
+
+@functools.lru_cache(maxsize=None)
+def warn_missing_tessdata(variant):
+    # Once per process and variant: tesseract_config runs for every image (OCR cache key)
+    logging.warning(f"⚠️ OCR profile wants the {variant!r} tessdata models but TESSDATA_{variant.upper()}_DIR "
+                    f"isn't set; using tesseract's default models")
+
+
+def config_value(value):
+    # pytesseract shlex-splits config (POSIX rules except on Windows): quote values such as the whitelist's '
+    return value if os.name == "nt" else shlex.quote(value)
+
+
+def tesseract_config(profile):
+    # Command-line form of a profile: what pytesseract passes to the binary, and part of the OCR cache key
+    parts = []
+    if "psm" in profile:
+        parts.append(f"--psm {profile['psm']}")
+    if "oem" in profile:
+        parts.append(f"--oem {profile['oem']}")
+    if profile.get("dpi"):
+        parts.append(f"--dpi {profile['dpi']}")
+    tessdata = tessdata_dir(profile.get("tessdata"))
+    if tessdata:
+        parts.append(f'--tessdata-dir "{tessdata}"')
+    if profile.get("whitelist"):
+        parts.append(f"-c tessedit_char_whitelist={config_value(profile['whitelist'])}")
+    return " ".join(parts)
+
+
+class PytesseractBackend:
+    """Runs the tesseract binary per call: writes a temp image, loads the model, parses stdout."""
+
+    name = "pytesseract"
+
+    def __init__(self, lang=None, profile=None):
+        import pytesseract
+        self.pytesseract = pytesseract
+        self.lang = lang
+        self.config = tesseract_config(profile or {})
+
+    def clone(self):
+        # Every call is its own tesseract process, so threads can share this one
+        return self
+
+    def version(self):
+        return str(self.pytesseract.get_tesseract_version())
+
+    def image_to_string(self, image):
+        return self.pytesseract.image_to_string(image, lang=self.lang, config=self.config)
+
+    def image_to_data(self, image):
+        return self.pytesseract.image_to_data(image, lang=self.lang, config=self.config,
+                                              output_type=self.pytesseract.Output.DICT)
+
+    def image_to_string_and_data(self, image):
+        return self.image_to_string(image), self.image_to_data(image)
+
+
+class TesserocrBackend:
+    """One Tesseract API handle per process: the model loads once and images go in as raw pixel buffers."""
+
+    name = "tesserocr"
+
+    def __init__(self, lang=None, profile=None):
+        import tesserocr
+        profile = profile or {}
+        self.tesserocr = tesserocr
+        self.lang, self.profile = lang, profile
+        options = {"lang": lang or "eng"}
+        tessdata = tessdata_dir(profile.get("tessdata"))
+        if tessdata:
+            options["path"] = tessdata
+        if "psm" in profile:
+            options["psm"] = profile["psm"]
+        if "oem" in profile:
+            options["oem"] = profile["oem"]
+        self.api = tesserocr.PyTessBaseAPI(**options)
+        if profile.get("whitelist"):
+            self.api.SetVariable("tessedit_char_whitelist", profile["whitelist"])
+        self.dpi = profile.get("dpi")
+        self._lock = threading.Lock()  # a handle recognizes one image at a time; app.py serves /ocr from threads
+
+    def clone(self):
+        # Another handle with the same settings, for OCR'ing images concurrently from several threads
+        return TesserocrBackend(self.lang, self.profile)
+
+    def version(self):
+        return self.tesserocr.tesseract_version().split()[1]
+
+    def _set_image(self, image):
+        height, width = image.shape[:2]
+        bytes_per_pixel = 1 if image.ndim == 2 else image.shape[2]
+        self.api.SetImageBytes(image.tobytes(), width, height, bytes_per_pixel, width * bytes_per_pixel)
+        if self.dpi:
+            self.api.SetSourceResolution(self.dpi)
+
+    def image_to_string(self, image):
+        with self._lock:
+            self._set_image(image)
+            return self.api.GetUTF8Text()
+
+    def image_to_data(self, image):
+        with self._lock:
+            self._set_image(image)
+            return tsv_to_dict(TSV_HEADER + "\n" + self.api.GetTSVText(0))
+
+    def image_to_string_and_data(self, image):
+        # One recognition serves both: the handle keeps the result until the next SetImage
+        with self._lock:
+            self._set_image(image)
+            return self.api.GetUTF8Text(), tsv_to_dict(TSV_HEADER + "\n" + self.api.GetTSVText(0))
+
+
+OCR_BACKENDS = {backend.name: backend for backend in (TesserocrBackend, PytesseractBackend)}
+
+
+def load_backend(name="auto", lang=None, profile=None):
+    # "auto" prefers the in-process engine; anything that can't load falls back to pytesseract
+    for candidate in (["tesserocr", "pytesseract"] if name == "auto" else [name, "pytesseract"]):
+        try:
+            backend = OCR_BACKENDS[candidate](lang, profile)
+        except KeyError:
+            raise ValueError(f"Unknown OCR backend {candidate!r}, expected one of {sorted(OCR_BACKENDS)} or 'auto'")
+        except (ImportError, RuntimeError) as e:
+            if name != "auto":
+                logging.warning(f"⚠️ OCR backend {candidate} unavailable ({e}), falling back to pytesseract")
+            continue
+        logging.info(f"🔤 OCR backend: {backend.name}")
+        return backend
+    raise RuntimeError("No OCR backend available")
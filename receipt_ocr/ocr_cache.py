@@ -0,0 +1,174 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+TOUCH_BATCH = 100     # lookups between writes of their last_used times and hit/miss counts
+TOUCH_INTERVAL = 5.0  # or seconds, whichever comes first
+
+
+class OCRCache:
+    """Raw OCR results keyed by image content hash + OCR parameters, stored in SQLite with LRU eviction.
+
+    Any change to the parameters produces a different key, so stale entries are never served;
+    they simply stop being used and age out of the LRU.
+    Lookups only read: their last_used times and hit/miss counts are kept in memory and written
+    in one transaction every TOUCH_BATCH lookups or TOUCH_INTERVAL seconds, or with the next put.
+    The byte total that eviction works against is kept in ocr_cache_stats next to the counts.
+    """
+
+    def __init__(self, path, max_bytes=512 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._lock = threading.Lock()  # guards the lookups not written yet
+        self._pid = None
+
+    def _noted(self):
+        # Caller holds the lock. -> (touched, lookups) noted by this process since the last write
+        if self._pid != os.getpid():
+            # New, or a forked pool worker: the parent's lookups are the parent's to write
+            self._touched = {}  # key -> last_used
+            self._lookups = {"hits": 0, "misses": 0}
+            self._flushed_at = time.time()
+            self._pid = os.getpid()
+        return self._touched, self._lookups
+
+    @property
+    def conn(self):
+        # One connection per process and thread (pool workers, scan_folder's OCR stage threads and
+        # Flask's request threads each open their own; SQLite connections can't be shared between threads)
+        local = self._local
+        if getattr(local, "conn", None) is None or local.pid != os.getpid():
+            local.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            local.conn.execute("PRAGMA journal_mode=WAL")
+            local.conn.execute("PRAGMA synchronous=NORMAL")
+            local.conn.execute('''
+                CREATE TABLE IF NOT EXISTS ocr_cache (
+                    key TEXT PRIMARY KEY,
+                    text TEXT NOT NULL,
+                    words TEXT,
+                    size INTEGER NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            ''')
+            local.conn.execute("CREATE INDEX IF NOT EXISTS idx_ocr_cache_last_used ON ocr_cache (last_used)")
+            local.conn.execute("CREATE TABLE IF NOT EXISTS ocr_cache_stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            if local.conn.execute("SELECT 1 FROM ocr_cache_stats WHERE name = 'bytes'").fetchone() is None:
+                # A cache from before the running total: add up its entries once
+                local.conn.execute('''
+                    INSERT OR IGNORE INTO ocr_cache_stats (name, value)
+                    SELECT 'bytes', COALESCE(SUM(size), 0) FROM ocr_cache
+                ''')
+            local.pid = os.getpid()
+        return local.conn
+
+    @staticmethod
+    def key(image_bytes, params):
+        params_hash = hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()[:16]
+        return f"{hashlib.sha256(image_bytes).hexdigest()}:{params_hash}"
+
+    def _count(self, name, n=1):
+        self.conn.execute('''
+            INSERT INTO ocr_cache_stats (name, value) VALUES (?, ?)
+            ON CONFLICT(name) DO UPDATE SET value = value + excluded.value
+        ''', (name, n))
+
+    def _write(self, fn):
+        # Runs fn() in one write transaction, together with the lookups noted since the last write
+        with self._lock:
+            touched, lookups = self._noted()
+            self._touched, self._lookups, self._flushed_at = {}, {"hits": 0, "misses": 0}, time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.executemany("UPDATE ocr_cache SET last_used = ? WHERE key = ?",
+                                  [(last_used, key) for key, last_used in touched.items()])
+            for name, n in lookups.items():
+                if n:
+                    self._count(name, n)
+            result = fn()
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        return result
+
+    def _note(self, key, hit):
+        # -> whether the lookups noted so far are due to be written
+        with self._lock:
+            touched, lookups = self._noted()
+            lookups["hits" if hit else "misses"] += 1
+            if hit:
+                touched[key] = time.time()
+            return sum(lookups.values()) >= TOUCH_BATCH or time.time() - self._flushed_at >= TOUCH_INTERVAL
+
+    def get(self, key):
+        # -> (text, words) or None
+        try:
+            row = self.conn.execute("SELECT text, words FROM ocr_cache WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            logging.error(f"❌ OCR cache read failed: {e}")
+            return None
+        if self._note(key, row is not None):
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                logging.warning(f"⚠️ OCR cache lookups not recorded: {e}")
+        if row is None:
+            return None
+        text, words = row
+        return text, json.loads(words) if words else None
+
+    def flush(self):
+        # Write the last_used times and hit/miss counts of the lookups noted so far
+        self._write(lambda: None)
+
+    def put(self, key, text, words=None):
+        words_json = json.dumps(words) if words is not None else None
+        size = len(text.encode()) + len(words_json or "")
+
+        def insert():
+            replaced = self.conn.execute("SELECT size FROM ocr_cache WHERE key = ?", (key,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO ocr_cache (key, text, words, size, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, text, words_json, size, time.time())
+            )
+            self._count("bytes", size - (replaced[0] if replaced else 0))
+            self.evict()
+        try:
+            self._write(insert)
+        except sqlite3.Error as e:
+            logging.error(f"❌ OCR cache write failed: {e}")
+
+    def evict(self):
+        # Oldest entries out until the byte total fits max_bytes. Inside put's write transaction,
+        # so the total and the entries it adds up stay in step across processes
+        total = self.conn.execute("SELECT value FROM ocr_cache_stats WHERE name = 'bytes'").fetchone()[0]
+        excess = total - self.max_bytes
+        if excess <= 0:
+            return 0
+        victims, freed = [], 0
+        cursor = self.conn.execute("SELECT key, size FROM ocr_cache ORDER BY last_used")
+        for key, size in cursor:
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        cursor.close()
+        self.conn.executemany("DELETE FROM ocr_cache WHERE key = ?", victims)
+        self._count("bytes", -freed)
+        self._count("evictions", len(victims))
+        return len(victims)
+
+    def stats(self):
+        # Counts include this process's unwritten lookups; other processes' show up once they write them
+        self.flush()
+        stats = {"hits": 0, "misses": 0, "evictions": 0, "bytes": 0}
+        stats.update(self.conn.execute("SELECT name, value FROM ocr_cache_stats").fetchall())
+        stats["entries"] = self.conn.execute("SELECT COUNT(*) FROM ocr_cache").fetchone()[0]
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        return stats
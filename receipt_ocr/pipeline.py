@@ -0,0 +1,1000 @@
+import atexit
+import functools
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from itertools import repeat
+
+from . import config
+from .archive import archive_image
+from .categories import CategoryClassifier
+from .corrections import CorrectionEngine
+from .db_writer import FINAL_RECEIPT_COLUMNS, ReceiptWriter, make_backend
+from .extraction_rules import load_rules
+from .metrics import metrics
+from .ocr_backends import get_profile, load_backend, tesseract_config
+from .ocr_cache import OCRCache
+from .sinks import make_sink
+from .streaming import Stage, StreamPipeline
+
+# OpenCV/numpy (preprocess), the OCR engine and fuzzywuzzy (vendor_index) are imported on first use,
+# so importing this module, --help and the light CLI commands don't pay for them.
+
+# Corrections every extraction shares (final.py's whole table)
+custom_corrections = {
+    "Tofal": "Total",
+    "Fotal": "Total",
+    "Toral": "Total",
+    "Tetai": "Total",
+    "casi": "Cash",
+    "Chinge": "Change",
+    "Chane": "Change",
+    "Receipl": "Receipt",
+    "Rectipt": "Receipt",
+    "INVOICEE": "INVOICE",
+    "NV": "INV",
+    "TIIN": "TIN",
+    "SABES": "SALES",
+    "Elever": "Eleven",
+    "Purpie": "Purple",
+    "Chine": "Chinese",
+    "Altamart": "Alfamart",
+}
+
+# Added to teseract.py and finalfinal.py after final.py was split off from them
+later_corrections = {
+    "HARY": "MARY",
+    "Sfhurburkss": "Starbucks",
+    "Cotter": "Coffee",
+    "AMOUKT": "Amount",
+    "Subtota]": "Subtotal",
+    "Subtota": "Subtotal",
+    "SHAHARHA": "SHAWARMA",
+    "TURK S": "TURK'S",
+    "SH": "SM",
+}
+
+# Entries each extraction was tuned with; "17" -> "IT" would eat amounts under the rules extraction
+extra_corrections = {
+    "rules": {
+        **later_corrections,
+        "FROPERTY": "PROPERTY", "SANAGENENT": "MANAGEMENT", "CORPORT": "CORPORATION", "Q!Save": "O!SAVE", "sTotal": "Total",
+        "Philippine Seven Corporation": "7-Eleven",
+    },
+    "legacy": {
+        **later_corrections,
+        "Tota!": "Total",
+        "NOME": "HOME",
+        "17": "IT",
+        "Net Tota!": "Net Total",
+    },
+    "final": {},
+}
+
+# final.py's store list; the other extractions match against the longer known_stores
+final_known_stores = [
+    "UNIQLO", "SM SUPERMARKET", "WATSONS", "7-ELEVEN", "JOLLIBEE",
+    "MCDONALD'S", "STARBUCKS", "ROBINSONS", "MINISO", "NATIONAL BOOKSTORE",
+    "SMSTORE", "SM STORE", "KENNY ROGERS ROASTERS", "EMILU'S MART", "Puregold", "JR ECONOVATION PEST CONTROL SERVICES",
+    "Purple Chinese", "Alfamart", "ALFAMART, AMI BUHO", "Puregold Price Club, Inc."
+]
+
+known_stores = final_known_stores + [
+    "Cafe Mary Grace", "Ikano", "AYALA PROPERTY MANAGEMENT CORPORATION",
+    "S&R PIZZA INC.", "KAMUNING BAKERY CORP", "Starbucks Coffee", "Chowking", "Turks Shawarma", "Erjohn & Almark Transit Corp", "Coco Fresh Tea & Juice",
+    "Jollibee", "CHOWKING", "CHOWKING VERMOSA", "JOLLIBEE", "JOLLIBEE SM DASMARINAS", "ZUSPRESSO", "ACE Hardware", "Home It Yourself", "WATSONS", "NORTHERN STAR ENERGY",
+    "Goldilocks", "Gong Cha", "WASHOKU KIKUFUJI", "SAVEMORE", "S&R", "SHELL", "ELECTROWORLD", "PREMIER SOUTHERN PETROLEUM", "COFFEE PROJECT", "JETTI", "O!SAVE", "O!SAVE Everyday Low Price"
+]
+
+category_keywords = {
+    "Meals": ["KENNY ROGERS ROASTERS", "Starbucks", "Jollibee", "Mcdonald", "Starbucks Coffee", "Jollibee", "Chowking"],
+    "medicine": ["WATSONS", "paracetamol", "drug", "capsule", "syrup", "Mercury Drugs"],
+    "Convenience": ["candy", "soda", "Alfamart", "7-eleven", "snack"],
+    "Grocery": ["Puregold", "SM SUPERMARKET", "ROBINSONS", "EMILU'S MART", "Puregold Price Club, Inc."],
+    "Transportation": ["Erjohn & Almark Transit Corp", "AYALA PROPERTY MANAGEMENT CORPORATION"]
+}
+final_category_keywords = {
+    "Meals": ["KENNY ROGERS ROASTERS", "Starbucks", "Jollibee", "Mcdonald"],
+    "medicine": ["WATSONS", "paracetamol", "drug", "capsule", "syrup", "Mercury Drugs"],
+    "Convenience": ["candy", "soda", "Alfamart", "7-eleven", "snack"],
+    "Grocery": ["Puregold", "SM SUPERMARKET", "ROBINSONS", "EMILU'S MART", "Puregold Price Club, Inc."],
+}
+# Each keyword found adds its category's weight; Convenience's generic item words (candy, soda, snack)
+# also turn up on grocery and meal receipts, so they count for less
+category_weights = {"Convenience": 0.8}
+
+# Legacy total patterns, in priority order (first match wins)
+legacy_total_patterns = [
+    # Priority 1 – Final totals (most accurate)
+    r'\b(?:NET\s*TOTAL|TOTAL DUE|AMOUNT DUE|GRAND TOTAL|DINE[- ]IN TOTAL|TOTAL AMOUNT|TOTAL)\b[^\d]{0,20}?(?:\(\d+\))?[^\d]{0,10}?(?:PHP|Php|php|₱|P)?\s*(\d{1,6}(?:[.,]\d{1,2})?)',
+    # Priority 2 – Cash paid
+    r'\bCash Tendered\b[^\d]{0,10}(?:PHP|Php|php|₱|P)?\s*(\d{1,6}(?:[.,]\d{1,2})?)',
+    # Priority 3 – Subtotals
+    r'\bSUB[- ]?TOTAL\b[^\d]{0,10}(?:PHP|Php|php|₱|P)?\s*(\d{1,6}(?:[.,]\d{1,2})?)',
+    r'\bSubtotal\b[^\d]{0,10}(?:PHP|Php|php|₱|P)?\s*(\d{1,6}(?:[.,]\d{1,2})?)',
+]
+# final.py's total patterns, in the same first-match-wins order
+final_total_patterns = [
+    r'\bTOTAL\s*\(?\d+\)?[^\d]{0,10}(\d{1,4}(?:[.,]\d{2}))',
+    r'\bDINE[- ]IN TOTAL\b[^\d]{0,10}(\d{1,4}(?:[.,]\d{2}))',
+    r'\bTOTAL DUE\b[^\d]{0,10}(\d{1,4}(?:[.,]\d{2}))',
+    r'\bTOTAL\b[^\d]{0,10}(\d{1,4}(?:[.,]\d{2}))',
+    r'\bAMOUNT DUE\b[^\d]{0,10}(\d{1,4}(?:[.,]\d{2}))',
+]
+# quality_flag of a near-duplicate that was skipped (DEDUP_SKIP=1): no OCR, no archive copy, no DB row
+DUPLICATE_FLAG = "Duplicate"
+# fields key carrying a receipt's dedup fingerprint to the archive stage, which holds it until the row is saved
+FINGERPRINT_KEY = "dedup_fingerprint"
+
+legacy_date_pattern = r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})(?:\s+\d{1,2}:\d{2})?'
+legacy_date_formats = [
+    "%d-%m-%Y", "%d/%m/%Y", "%m-%d-%Y", "%m/%d/%Y",
+    "%d-%m-%y", "%d/%m/%y", "%m-%d-%y", "%m/%d/%y"
+]
+final_date_pattern = r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})'
+final_date_formats = ["%d-%m-%Y", "%d/%m/%Y", "%m-%d-%Y", "%m/%d/%Y", "%d-%m-%y", "%d/%m/%y"]
+
+
+# Built on first use and then shared by every receipt this process handles
+@functools.lru_cache(maxsize=None)
+def get_correction_engine():
+    return CorrectionEngine({**custom_corrections, **extra_corrections[config.extraction]}, config.corrections_file)
+
+
+@functools.lru_cache(maxsize=None)
+def get_vendor_index():
+    from .vendor_index import VendorIndex  # normalized and deduplicated once
+    return VendorIndex(final_known_stores if config.extraction == "final" else known_stores)
+
+
+@functools.lru_cache(maxsize=None)
+def get_category_classifier():
+    # vendor_categories.json (see `python -m receipt_ocr bootstrap-categories`) is picked up without a restart
+    if config.extraction == "final":
+        return CategoryClassifier(final_category_keywords, category_weights, final_known_stores, config.vendor_categories_file)
+    return CategoryClassifier(category_keywords, category_weights, known_stores, config.vendor_categories_file)
+
+
+@functools.lru_cache(maxsize=None)
+def get_extraction_rules():
+    return load_rules(config.extraction_rules_file)
+
+
+@functools.lru_cache(maxsize=None)
+def get_db_writer():
+    # Pooled, batched inserts; DB_BACKEND=sqlite writes to a local SQLite file instead of MySQL
+    # final.py inserts only the five columns its table has; otherwise the writer picks them for its backend
+    columns = FINAL_RECEIPT_COLUMNS if config.extraction == "final" else None
+    writer = ReceiptWriter(make_backend(), columns, batch_size=config.db_batch_size, flush_interval=config.db_flush_interval)
+    atexit.register(writer.close)
+    return writer
+
+
+@functools.lru_cache(maxsize=None)
+def get_result_sinks():
+    # RESULT_SINKS, e.g. "db,parquet": every saved receipt goes to each; all flush their last batch at exit
+    sinks = []
+    for name in (name.strip() for name in config.result_sinks.split(",")):
+        if name == "db":
+            sinks.append(get_db_writer())
+        elif name:
+            sink = make_sink(name, config.results_dir, config.sink_batch_size, config.db_flush_interval)
+            atexit.register(sink.close)
+            sinks.append(sink)
+    return sinks
+
+
+@functools.lru_cache(maxsize=None)
+def get_ocr_backend(profile="default"):
+    # One per process and profile, so a pool worker keeps its Tesseract handle (and loaded model) for every image
+    return load_backend(config.ocr_backend, config.ocr_lang, get_profile(profile))
+
+
+@functools.lru_cache(maxsize=None)
+def get_tile_executor():
+    # Threads live as long as the process, and so do their engines (see tile_engine)
+    return ThreadPoolExecutor(max_workers=config.ocr_tile_workers, thread_name_prefix="ocr-tile")
+
+
+@functools.lru_cache(maxsize=None)
+def get_ocr_cache():
+    return OCRCache(config.ocr_cache_path, config.ocr_cache_max_bytes) if config.ocr_cache_path else None
+
+
+@functools.lru_cache(maxsize=None)
+def get_duplicate_index():
+    if not config.dedup:
+        return None
+    from .dedup import DuplicateIndex  # loads every stored hash once per process
+    return DuplicateIndex(config.dedup_path, config.dedup_hash)
+
+
+def clean_ocr_text(text):
+    return re.sub(r'[^\x00-\x7F]+', '', text).strip()
+
+@metrics.timed("corrections")
+def apply_custom_corrections(text, engine=None):
+    return (engine if engine is not None else get_correction_engine()).apply(text)
+
+def filter_lines(text):
+    lines = text.splitlines()
+    return "\n".join([line for line in lines if line.strip()])
+
+def extract_vendor(text, index=None, top_lines=10):
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    lines = lines[:top_lines]  # Only use top lines for vendor detection
+
+    best_match, best_score, matched_line = (index if index is not None else get_vendor_index()).best_match(lines, "token_sort", 75)
+    logging.info(f"🛒 Vendor match: {best_match} (matched line: '{matched_line}', score: {best_score})")
+    return best_match, best_score
+
+
+def extract_vendor_legacy(text, index=None):
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    best_match, _, _ = (index if index is not None else get_vendor_index()).best_match(lines, "partial", 80)
+    return best_match
+
+
+def guess_category(text, vendor=None):
+    category, source = get_category_classifier().classify(text, vendor)
+    metrics.incr("category_source", source)
+    return category
+
+
+@metrics.timed("extraction")
+def extract_structured_info(text):
+    # -> (fields, quality_flag); the legacy extraction leaves quality to the OCR word confidences (None here),
+    # the final one (final.py's own tables) has no quality at all
+    if config.extraction == "legacy":
+        return extract_structured_info_legacy(text), None
+    if config.extraction == "final":
+        return extract_structured_info_legacy(text, final_date_pattern, final_date_formats, final_total_patterns), None
+    return extract_structured_info_rules(text)
+
+
+def extract_structured_info_rules(text):
+    data = {}
+    rules = get_extraction_rules()
+    vendor, score = extract_vendor(text)
+    data['vendor'] = vendor
+    data['vendor_confidence'] = score
+
+    # Date (convert to YYYY-MM-DD)
+    date_match = rules.find_date(text)
+    if date_match:
+        raw_date, parsed_date = date_match
+        if parsed_date:
+            data['date'] = parsed_date
+            data['date_confidence'] = 90  # Parsed successfully
+        else:
+            data['date'] = raw_date  # fallback
+            data['date_confidence'] = 50
+
+    # Total (weighted rules from extraction_rules.json, take the *largest* valid match)
+    matched_totals = rules.find_totals(text)
+
+    if matched_totals:
+        total_value, confidence = max(matched_totals, key=lambda x: x[0])  # pick largest
+        data['total'] = total_value
+        data['total_confidence'] = confidence
+    else:
+        # smarter fallback
+        numbers = rules.find_amounts(text)
+        if numbers:
+            max_number = max(numbers)
+            data['total'] = max_number
+
+            # Heuristic confidence score based on how likely it is the true total
+            if len(numbers) == 1:
+                data['total_confidence'] = 85
+            elif max_number > 500:
+                data['total_confidence'] = 80
+            elif max_number > 100:
+                data['total_confidence'] = 70
+            else:
+                data['total_confidence'] = 50
+
+    # Category: matched vendor first, keywords otherwise
+    data['category'] = guess_category(text, vendor)
+
+    # ✅ Add confidence averaging here
+    confidences = [
+        data.get('vendor_confidence', 0),
+        data.get('total_confidence', 0),
+        data.get('date_confidence', 0),
+    ]
+    if any(confidences):
+        data['confidence_score'] = round(sum(confidences) / len(confidences), 2)
+    else:
+        data['confidence_score'] = 0.0
+    quality_flag = (
+        "Low" if data['confidence_score'] < 50 else
+        "Good" if data['confidence_score'] < 80 else
+        "Very Good" if data['confidence_score'] < 90 else
+        "Excellent"
+    )
+
+    return data, quality_flag
+
+
+def extract_structured_info_legacy(text, date_pattern=legacy_date_pattern, date_formats=legacy_date_formats,
+                                    total_patterns=legacy_total_patterns):
+    data = {}
+    lines = text.splitlines()
+    first_lines = [line.strip() for line in lines[:10] if line.strip()]
+
+    # Fuzzy match for store name
+    best_match, _, _ = get_vendor_index().best_match(first_lines, "ratio", 75)
+    if best_match:
+        data['vendor'] = extract_vendor_legacy(text)
+
+    # Date (convert to YYYY-MM-DD)
+    date_match = re.search(date_pattern, text)
+    if date_match:
+        raw_date = date_match.group(1)
+        for fmt in date_formats:
+            try:
+                parsed_date = datetime.strptime(raw_date, fmt)
+                data['date'] = parsed_date.strftime("%Y-%m-%d")
+                break
+            except ValueError:
+                continue
+
+    # Total (try multiple patterns)
+    for pattern in total_patterns:
+        total_match = re.search(pattern, text, re.IGNORECASE)
+        if total_match:
+            try:
+                amount = total_match.group(1).replace(',', '')
+                data['total'] = float(amount)
+                break
+            except ValueError:
+                continue
+
+    # Optional fallback: extract the largest amount (only if no total found)
+    if 'total' not in data:
+        amounts = re.findall(r'(\d{1,4}(?:[.,]\d{2}))', text)
+        try:
+            numbers = [float(a.replace(',', '')) for a in amounts]
+            if numbers:
+                data['total'] = max(numbers)
+        except ValueError:
+            pass
+
+    # Category: matched vendor first, keywords otherwise
+    data['category'] = guess_category(text, data.get('vendor'))
+
+    return data
+
+
+@metrics.timed("db_write")
+def save_to_database(receipt_data):
+    get_db_writer().add(receipt_data)
+
+
+def when_all_saved(count, on_saved=None, on_failed=None):
+    # -> (saved, failed) callbacks shared by count sinks: on_saved runs once the last of them has written
+    # the row, on_failed once as soon as one of them gives up on it
+    lock = threading.Lock()
+    remaining = [count]
+
+    def saved():
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last and on_saved is not None:
+            on_saved()
+
+    def failed():
+        with lock:
+            first = remaining[0] > 0
+            remaining[0] = -1  # the row can't be saved everywhere any more
+        if first and on_failed is not None:
+            on_failed()
+    return saved, failed
+
+
+@metrics.timed("sink_write")
+def save_result(receipt_data, on_saved=None, on_failed=None):
+    # Only buffers the row: on_saved (if given) runs once every sink has actually written it,
+    # on_failed once a sink gave up on it
+    sinks = get_result_sinks()
+    saved = failed = None
+    if on_saved is not None or on_failed is not None:
+        saved, failed = when_all_saved(len(sinks), on_saved, on_failed)
+    for sink in sinks:
+        sink.add(receipt_data, saved, failed)
+
+
+def flush_results():
+    # End of a scan: write out every sink's buffer and finish per-run files (Parquet footers)
+    for sink in get_result_sinks():
+        sink.end_run()
+
+
+def opened_sinks():
+    # The sinks this process has already opened, without opening any (no MySQL connection, no RESULTS_DIR)
+    if get_result_sinks.cache_info().currsize:
+        return get_result_sinks()
+    return [get_db_writer()] if get_db_writer.cache_info().currsize else []
+
+
+# New: Save image to XAMPP uploads folder
+@metrics.timed("archival")
+def save_receipt_image(image_path, filename):
+    try:
+        # Stored under its content hash: hardlinked when possible, duplicates cost nothing
+        stored_name = archive_image(image_path, config.archive_folder, hardlink=config.archive_hardlink)
+    except Exception as e:
+        logging.error(f"❌ Error saving image {filename}: {e}")
+        return None
+
+    # Return relative path for DB
+    return f"../uploads/scanned/{stored_name}"
+
+
+def data_to_text(ocr_data):
+    # Rebuild image_to_string-style text from image_to_data word rows.
+    # Words are grouped by (block, par, line); a blank line separates paragraphs.
+    lines = []
+    last_line = None
+    last_par = None
+    for i, word in enumerate(ocr_data['text']):
+        word = str(word).strip()
+        if ocr_data['level'][i] != 5 or not word:
+            continue
+        par = (ocr_data['page_num'][i], ocr_data['block_num'][i], ocr_data['par_num'][i])
+        line = par + (ocr_data['line_num'][i],)
+        if line != last_line:
+            if last_par is not None and par != last_par:
+                lines.append("")
+            lines.append(word)
+            last_line, last_par = line, par
+        else:
+            lines[-1] += " " + word
+    return "\n".join(lines)
+
+
+def confidence_from_data(ocr_data):
+    confidences = [int(conf) for conf in ocr_data['conf'] if str(conf).isdigit()]
+    avg_conf = sum(confidences) / len(confidences) if confidences else 0
+    quality_flag = "Low" if avg_conf < 50 else "Good" if avg_conf < 80 else "Very Good" if avg_conf < 90 else "Excellent"
+    return avg_conf, quality_flag
+
+
+@functools.lru_cache(maxsize=None)
+def tesseract_version():
+    return get_ocr_backend().version()
+
+
+def ocr_params(profile="default", **extra):
+    # Everything that changes the raw OCR output belongs here, so changing it invalidates the cache
+    from .preprocess import preprocess_signature
+    params = {
+        "preprocess": preprocess_signature(config.preprocess_mode, config.target_text_height, config.receipt_crop),
+        "tesseract": tesseract_version(),
+        "backend": get_ocr_backend(profile).name,
+        "lang": config.ocr_lang,
+        "config": tesseract_config(get_profile(profile)),
+    }
+    if config.ocr_cascade:
+        params["cascade"] = [config.cascade_header_ratio, config.cascade_footer_ratio,
+                             config.cascade_min_aspect, config.cascade_min_confidence]
+    if config.adaptive_preprocess:
+        params["adaptive"] = [adaptive_methods(), config.adaptive_min_confidence]
+    params.update(extra)
+    return params
+
+
+class UnreadableImageError(ValueError):
+    """The file given to OCR can't be read, or the bytes aren't an image OpenCV can decode."""
+
+
+def read_image(image_path):
+    try:
+        with open(image_path, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def ocr_with_tesseract(image_path, single_pass=True, profile=None, tiled=None):
+    # tiled: OCR tall images as parallel overlapping strips (defaults to OCR_TILES)
+    image_bytes = read_image(image_path)
+    if image_bytes is None:
+        raise UnreadableImageError(f"Could not load image: {image_path}")
+    return ocr_image_bytes(image_bytes, single_pass, source=image_path, profile=profile, tiled=tiled)
+
+
+def merge_ocr_data(parts):
+    # image_to_data rows of several strips as one dict; each strip becomes its own page so lines never merge
+    merged = {}
+    for page, ocr_data in enumerate(parts, 1):
+        for column, values in ocr_data.items():
+            merged.setdefault(column, []).extend([page] * len(values) if column == "page_num" else values)
+    return merged
+
+
+def run_ocr(backend, image, legacy, single_pass):
+    # -> (raw_text, ocr_data); ocr_data (word rows + confidences) only for the legacy extraction
+    metrics.incr("ocr_pixels", amount=image.shape[0] * image.shape[1])
+    if not legacy:
+        return backend.image_to_string(image), None
+    if single_pass:
+        # One Tesseract call gives both the text and the word confidences
+        ocr_data = backend.image_to_data(image)
+        return data_to_text(ocr_data), ocr_data
+    return backend.image_to_string_and_data(image)
+
+
+_tile_engines = threading.local()
+
+
+def tile_engine(backend):
+    # Each tile thread OCRs with its own clone of the backend: a tesserocr handle recognizes one image at a time
+    engines = _tile_engines.__dict__.setdefault("engines", {})
+    if backend not in engines:
+        engines[backend] = backend.clone()
+    return engines[backend]
+
+
+def ocr_tile(backend, tile):
+    return tile_engine(backend).image_to_data(tile)
+
+
+def stitch_tiles(tiles):
+    # tiles: [(ocr_data, (start, end, keep_from, keep_to))] -> one image_to_data dict in page order.
+    # A line in an overlap is read by both tiles; it is kept from the one whose keep band holds its centre.
+    parts = []
+    for ocr_data, (start, _, keep_from, keep_to) in tiles:
+        lines = {}
+        for i, level in enumerate(ocr_data['level']):
+            if level == 5 and str(ocr_data['text'][i]).strip():
+                key = (ocr_data['block_num'][i], ocr_data['par_num'][i], ocr_data['line_num'][i])
+                lines.setdefault(key, []).append(i)
+        rows = []
+        for words in lines.values():
+            centre = start + sum(ocr_data['top'][i] + ocr_data['height'][i] / 2 for i in words) / len(words)
+            if keep_from <= centre < keep_to:
+                rows.extend(words)
+        rows.sort()
+        part = {column: [values[i] for i in rows] for column, values in ocr_data.items()}
+        part['top'] = [top + start for top in part['top']]
+        parts.append(part)
+    return merge_ocr_data(parts)
+
+
+def run_ocr_tiled(backend, image, legacy, single_pass):
+    # Like run_ocr, but a tall image is OCR'd as overlapping tiles in parallel and stitched back together
+    from .preprocess import tile_rows
+
+    tiles = tile_rows(image.shape[0], config.ocr_tile_height, config.ocr_tile_overlap)
+    if len(tiles) < 2:
+        return run_ocr(backend, image, legacy, single_pass)
+    metrics.incr("ocr_tiles", amount=len(tiles))
+    metrics.incr("ocr_pixels", amount=sum(end - start for start, end, _, _ in tiles) * image.shape[1])
+    results = get_tile_executor().map(ocr_tile, repeat(backend), [image[start:end] for start, end, _, _ in tiles])
+    ocr_data = stitch_tiles(zip(results, tiles))
+    return data_to_text(ocr_data), ocr_data if legacy else None
+
+
+def text_to_fields(raw_text, ocr_data, legacy):
+    # -> (text, fields, ocr_confidence, quality_flag) from raw OCR output
+    cleaned = clean_ocr_text(raw_text)
+    corrected = apply_custom_corrections(cleaned)
+    filtered = filter_lines(corrected)
+    extracted, quality_flag = extract_structured_info(filtered)
+
+    avg_conf = None
+    if legacy:
+        avg_conf, quality_flag = confidence_from_data(ocr_data)
+        extracted['confidence_score'] = round(avg_conf, 2)
+    return filtered, extracted, avg_conf, quality_flag
+
+
+def extraction_scored():
+    # final.py's extraction gives no confidence to judge cascade strips or retry binarizations by
+    return config.extraction != "final"
+
+
+def cascade_confident(extracted, avg_conf, legacy):
+    # The strips are enough when every field came out of them confidently. The legacy extraction has no
+    # per-field confidences: it needs all three fields plus a good mean word confidence instead.
+    threshold = config.cascade_min_confidence
+    if legacy:
+        return all(extracted.get(field) for field in ("vendor", "date", "total")) and avg_conf >= threshold
+    return all(extracted.get(f"{field}_confidence", 0) >= threshold for field in ("vendor", "date", "total"))
+
+
+def recognize(backend, thresh, legacy, single_pass, tiled=False):
+    # -> (raw_text, ocr_data, result). With OCR_CASCADE the header and footer strips go first and
+    # result holds their text_to_fields() output when that is good enough; otherwise the full page
+    # is OCR'd (in parallel tiles when tiled) and result is None.
+    from .preprocess import header_footer_strips
+
+    strips = header_footer_strips(thresh, config.cascade_header_ratio, config.cascade_footer_ratio,
+                                  config.cascade_min_aspect) if config.ocr_cascade and extraction_scored() else None
+    if strips:
+        parts = [run_ocr(backend, strip, legacy, single_pass) for strip in strips]
+        raw_text = "\n\n".join(text for text, _ in parts)
+        ocr_data = merge_ocr_data([data for _, data in parts]) if legacy else None
+        result = text_to_fields(raw_text, ocr_data, legacy)
+        if cascade_confident(result[1], result[2], legacy):
+            metrics.incr("ocr_cascade", "early_exit")
+            return raw_text, ocr_data, result
+        metrics.incr("ocr_cascade", "full_page")
+    raw_text, ocr_data = (run_ocr_tiled if tiled else run_ocr)(backend, thresh, legacy, single_pass)
+    return raw_text, ocr_data, None
+
+
+def adaptive_methods():
+    # Retry binarizations in order, cut to the per-image budget
+    methods = [method.strip() for method in config.adaptive_methods.split(",") if method.strip()]
+    return methods[:max(config.adaptive_retries, 0)]
+
+
+def result_score(result):
+    # Field confidence ("rules") or mean word confidence ("legacy"): both land in confidence_score
+    return result[1].get('confidence_score', 0)
+
+
+def retry_binarizations(backend, gray, legacy, single_pass, tiled, first):
+    # first: (raw_text, ocr_data, result) of the Otsu pass. Only a pass scoring below ADAPTIVE_MIN_CONFIDENCE
+    # pays for retries, each with another binarization of the same grayscale image; the best one wins.
+    from .preprocess import threshold
+
+    best, best_method = first, "otsu"
+    for method in adaptive_methods():
+        if result_score(best[2]) >= config.adaptive_min_confidence:
+            break
+        metrics.incr("preprocess_retry", method)
+        raw_text, ocr_data, result = recognize(backend, threshold(gray, method), legacy, single_pass, tiled)
+        candidate = (raw_text, ocr_data, result or text_to_fields(raw_text, ocr_data, legacy))
+        if result_score(candidate[2]) > result_score(best[2]):
+            best, best_method = candidate, method
+    metrics.incr("binarization", best_method)
+    return best
+
+
+def duplicate_fields(match, source):
+    distance, mismatch, earlier = match
+    logging.info(f"👯 {source} looks like {earlier} ({distance} bits apart, {mismatch:.1%} of the detail differs)")
+    return {"duplicate_of": earlier, "duplicate_distance": distance, "duplicate_mismatch": round(mismatch, 4)}
+
+
+@metrics.timed("dedup")
+def find_duplicate(image_bytes, source):
+    # -> (duplicate, fingerprint). duplicate is {"duplicate_of": earlier source, "duplicate_distance": bits,
+    # "duplicate_mismatch": detail share} when a saved or held receipt looks the same, else None;
+    # fingerprint is what claim_receipt holds for this one (None when the bytes don't decode)
+    from .dedup import fingerprint as receipt_fingerprint
+
+    index = get_duplicate_index()
+    fingerprint = receipt_fingerprint(image_bytes, config.dedup_hash) if index is not None else None
+    if fingerprint is None:
+        return None, None
+    match = index.find(*fingerprint, source, config.dedup_distance, config.dedup_mismatch)
+    metrics.incr("duplicates", "found" if match else "unique")
+    if match is None:
+        return None, fingerprint
+    return duplicate_fields(match, source), fingerprint
+
+
+def claim_receipt(fingerprint, source):
+    # -> (duplicate, token). Checks the receipt once more, now against the receipts held by this process
+    # as well (OCR pool workers only see saved ones), and holds it when it's still unique: later copies in
+    # the same scan are then its duplicates. The token goes to remember_receipt once the row is saved,
+    # or to forget_receipt when it isn't.
+    match, token = get_duplicate_index().hold(*fingerprint, source, config.dedup_distance, config.dedup_mismatch)
+    if match is None:
+        return None, token
+    metrics.incr("duplicates", "in_flight")
+    return duplicate_fields(match, source), None
+
+
+def remember_receipt(token, source):
+    # A saved receipt becomes the reference later copies are checked against
+    try:
+        get_duplicate_index().commit(token)
+    except sqlite3.Error as e:
+        logging.warning(f"⚠️ {source} was saved but not added to the duplicate index: {e}")
+
+
+def forget_receipt(token):
+    # A held receipt that wasn't saved: later copies must not be judged against it
+    if token is not None:
+        get_duplicate_index().drop(token)
+
+
+@metrics.timed("ocr")
+def ocr_image_bytes(image_bytes, single_pass=True, source="<upload>", profile=None, tiled=None):
+    # -> (text, fields, ocr_confidence, quality_flag). Works on bytes already in memory (no temp files).
+    # Raises UnreadableImageError when the bytes don't decode.
+    # ocr_confidence is the mean Tesseract word confidence for the legacy extraction, None for rules.
+    # profile picks the Tesseract settings (OCR_PROFILES); the one used is recorded as fields['ocr_profile'].
+    # With DEDUP=1 near-duplicates of saved receipts get fields['duplicate_of'], or with DEDUP_SKIP=1 come
+    # back right away as ("", {duplicate_of, ...}, None, DUPLICATE_FLAG); other receipts carry their
+    # fingerprint as fields[FINGERPRINT_KEY] for whoever saves them (see archive_stage).
+    from .preprocess import decode_image, prepare_gray, threshold
+
+    profile = profile or config.ocr_profile
+    get_profile(profile)  # unknown names fail before any work is done
+    duplicate, fingerprint = find_duplicate(image_bytes, source) if config.dedup else (None, None)
+    if duplicate and config.dedup_skip:
+        metrics.incr("quality_flag", DUPLICATE_FLAG)
+        return "", {**duplicate, 'ocr_profile': profile}, None, DUPLICATE_FLAG
+    tiled = config.ocr_tiles if tiled is None else tiled
+    legacy = config.extraction == "legacy"
+    # Names what was stored: the legacy extraction needs the word rows, which image_to_string entries lack
+    ocr_call = ("image_to_data" if single_pass else "image_to_string_and_data") if legacy else "image_to_string"
+    tiling = {"tiles": [config.ocr_tile_height, config.ocr_tile_overlap]} if tiled else {}
+    ocr_cache = get_ocr_cache()
+    cache_key = OCRCache.key(image_bytes, ocr_params(profile, ocr=ocr_call, **tiling)) if ocr_cache else None
+    cached = ocr_cache.get(cache_key) if ocr_cache else None
+    if ocr_cache:
+        metrics.incr("ocr_cache", "hit" if cached else "miss")
+    result = None
+    if cached:
+        raw_text, ocr_data = cached
+    else:
+        gray = decode_image(image_bytes, config.preprocess_mode)
+        if gray is None:
+            raise UnreadableImageError(f"Could not decode image: {source}")
+        gray = prepare_gray(gray, config.preprocess_mode, config.target_text_height, config.receipt_crop)
+
+        backend = get_ocr_backend(profile)
+        raw_text, ocr_data, result = recognize(backend, threshold(gray), legacy, single_pass, tiled)
+        if config.adaptive_preprocess and extraction_scored():
+            first = (raw_text, ocr_data, result or text_to_fields(raw_text, ocr_data, legacy))
+            raw_text, ocr_data, result = retry_binarizations(backend, gray, legacy, single_pass, tiled, first)
+        if ocr_cache:
+            ocr_cache.put(cache_key, raw_text, ocr_data)
+
+    filtered, extracted, avg_conf, quality_flag = result or text_to_fields(raw_text, ocr_data, legacy)
+    extracted['ocr_profile'] = profile
+    if duplicate:
+        extracted.update(duplicate)
+    elif fingerprint is not None:
+        extracted[FINGERPRINT_KEY] = fingerprint
+    if quality_flag is not None:
+        metrics.incr("quality_flag", quality_flag)
+    metrics.incr("ocr_profile", profile)
+
+    return filtered, extracted, avg_conf, quality_flag
+
+
+def warm_up():
+    # ProcessPoolExecutor initializer: each worker loads the OCR engine, heavy imports and tables once, up front
+    from . import preprocess  # noqa: F401
+    get_ocr_backend(config.ocr_profile)
+    get_correction_engine()
+    get_vendor_index()
+    get_category_classifier()
+    get_duplicate_index()
+    if config.extraction == "rules":
+        get_extraction_rules()
+
+
+def make_executor(workers):
+    return ProcessPoolExecutor(max_workers=workers, initializer=warm_up) if workers > 1 else None
+
+
+def stage_summary():
+    # Mean ms per stage since startup, for the end-of-scan log line
+    latency = metrics.to_dict()["latency_seconds"]
+    return {stage: round(hist["sum"] / hist["count"] * 1000, 1) for stage, hist in latency.items() if hist["count"]}
+
+
+def scan_image_bytes(image_bytes, source, profile=None):
+    # Runs inside a worker process: decode, OCR + extraction only, no file copy / DB side effects.
+    # The worker's timings/counters ride back with the result and are merged by the parent.
+    try:
+        return ocr_image_bytes(image_bytes, source=source, profile=profile), None, metrics.drain()
+    except UnreadableImageError as e:
+        return None, str(e), metrics.drain()
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}", metrics.drain()
+
+
+def iter_images(folder_path, manifest=None, settle_seconds=0, counts=None):
+    # Yields (filename, image_path, stat) in directory order as os.scandir finds them, minus files the
+    # manifest has already processed; counts (if given) gets the "new"/"skipped" tallies
+    supported_ext = ['.jpg', '.jpeg', '.png']
+    counts = counts if counts is not None else {}
+    counts.setdefault("new", 0)
+    counts.setdefault("skipped", 0)
+    now = time.time()
+    with os.scandir(folder_path) as entries:
+        for entry in entries:
+            try:
+                if not entry.is_file() or not any(entry.name.lower().endswith(ext) for ext in supported_ext):
+                    continue
+                st = entry.stat()
+                if settle_seconds and now - st.st_mtime < settle_seconds:
+                    continue  # still being written; pick it up next poll
+                if manifest is not None and manifest.is_processed(entry.path, st):
+                    counts["skipped"] += 1
+                    continue
+            except OSError as e:
+                logging.warning(f"⚠️ Skipping {entry.path}: {e}")  # moved or deleted since the listing
+                continue
+            counts["new"] += 1
+            yield entry.name, entry.path, st
+
+
+def read_stage(item):
+    # A file that can't be read becomes the item's error, logged once by write_stage
+    item['image_bytes'] = read_image(item['path'])
+    if item['image_bytes'] is None:
+        item['error'] = "Could not load image"
+    return item
+
+
+def ocr_stage(ocr_pool, profile, broken):
+    # Each stage thread keeps one image in flight: in the process pool, or in this process without one.
+    # broken (a threading.Event) is set when a worker died and took the pool with it.
+    def run(item):
+        image_bytes = item.pop('image_bytes')
+        if ocr_pool:
+            try:
+                result, error, worker_metrics = ocr_pool.submit(scan_image_bytes, image_bytes, item['path'], profile).result()
+            except BrokenProcessPool:
+                broken.set()
+                raise
+            metrics.merge(worker_metrics)
+        else:
+            try:
+                result, error = ocr_image_bytes(image_bytes, source=item['path'], profile=profile), None
+            except UnreadableImageError as e:
+                result, error = None, str(e)  # a failed file, not an empty receipt
+        item['result'], item['error'] = result, error
+        return item
+    return run
+
+
+def archive_stage(item):
+    fingerprint = item['result'][1].pop(FINGERPRINT_KEY, None)
+    if fingerprint is not None:
+        # A copy of a receipt still in flight (same scan, other worker) is only caught here
+        duplicate, item['dedup_token'] = claim_receipt(fingerprint, item['path'])
+        if duplicate and config.dedup_skip:
+            metrics.incr("quality_flag", DUPLICATE_FLAG)
+            item['result'] = ("", {**duplicate, 'ocr_profile': item['result'][1].get('ocr_profile')}, None, DUPLICATE_FLAG)
+        elif duplicate:
+            item['result'][1].update(duplicate)
+    if item['result'][3] == DUPLICATE_FLAG:
+        return item  # the earlier copy is already archived
+    item['image_url'] = save_receipt_image(item['path'], item['name'])
+    return item
+
+
+def record_processed(manifest, path, st):
+    try:
+        manifest.record(path, st)
+    except OSError as e:
+        logging.warning(f"⚠️ {path} was saved but not recorded as processed: {e}")
+
+
+def record_saved(manifest, path, st, token):
+    # on_saved of a scanned receipt: only rows every sink has written count as processed / as dedup references
+    if token is not None:
+        remember_receipt(token, path)
+    if manifest is not None:
+        record_processed(manifest, path, st)
+
+
+def write_stage(manifest, errors):
+    # Single thread, so the error list needs no locking. A file is recorded in the manifest (and its
+    # held fingerprint in the duplicate index) only once its row is written, from whichever thread flushes
+    # the batch, so rows lost to a failed batch are picked up again by the next scan
+    def run(item):
+        token = item.get('dedup_token')
+        if item.get('error'):
+            forget_receipt(token)  # e.g. the archive copy failed after the receipt was held
+            logging.error(f"❌ Failed to scan {item['name']}: {item['error']}")
+            metrics.incr("receipts", "failed")
+            errors.append((item['name'], item['error']))
+            return item
+        text, info, _, quality_flag = item['result']
+        if quality_flag == DUPLICATE_FLAG:
+            logging.info(f"👯 Skipped {item['name']}: duplicate of {info['duplicate_of']}")
+            metrics.incr("receipts", "duplicate")
+            if manifest is not None:
+                record_processed(manifest, item['path'], item['stat'])
+            return item
+        info['image_path'] = item['image_url']
+        info['raw_text'] = text
+        info['quality'] = quality_flag
+        info['source'] = item['path']
+        if config.verbose:
+            print(f"\n🔍 Scanning: {item['name']}")
+            print("📄 OCR Result:\n", text)
+            print("\n📌 Extracted Info:\n", info)
+            print("------------------------------------------------")
+        on_saved = on_failed = None
+        if manifest is not None or token is not None:
+            on_saved = functools.partial(record_saved, manifest, item['path'], item['stat'], token)
+        if token is not None:
+            on_failed = functools.partial(forget_receipt, token)
+        save_result(info, on_saved, on_failed)
+        metrics.incr("receipts", "ok")
+        return item
+    return run
+
+
+def scan_folder(folder_path, workers=1, executor=None, manifest=None, settle_seconds=0, profile=None):
+    # Streams the folder through read -> ocr -> archive -> write stages joined by bounded queues
+    # (SCAN_QUEUE_SIZE), so disk reads, OCR, file copies and DB writes overlap and memory stays flat
+    # however many images there are. OCR and archiving finish in any order, but the write stage is
+    # ordered: rows, manifest records and errors come out in directory order, as os.scandir lists them.
+    # workers > 1 spreads OCR across processes; a long-running caller (app.py) can pass its own warm
+    # executor instead (workers then sets how many images it keeps in flight there).
+    # profile: OCR profile for this batch (defaults to OCR_PROFILE)
+    # With a caller's executor, raises BrokenProcessPool at the end when an OCR worker died (e.g. a native
+    # crash in tesserocr): the executor is unusable from then on and the caller has to replace it. Images
+    # that failed because of it aren't in the manifest, so the next scan retries them.
+    profile = profile or config.ocr_profile
+    get_profile(profile)
+    pool = make_executor(workers) if executor is None else None
+    ocr_pool = executor or pool
+    counts, errors = {}, []
+    broken = threading.Event()
+    stream = StreamPipeline([
+        Stage("read", read_stage, config.scan_io_threads, config.scan_queue_size),
+        Stage("ocr", ocr_stage(ocr_pool, profile, broken), max(workers, 1), config.scan_queue_size),
+        Stage("archive", archive_stage, config.scan_io_threads, config.scan_queue_size),
+        Stage("write", write_stage(manifest, errors), 1, config.scan_queue_size, errors=True, ordered=True),
+    ])
+    images = ({'name': name, 'path': path, 'stat': st}
+              for name, path, st in iter_images(folder_path, manifest, settle_seconds, counts))
+    try:
+        stream.run(images)
+    finally:
+        if pool:
+            pool.shutdown()
+        flush_results()
+
+    if manifest is not None:
+        logging.info(f"🗂️ {counts['new']} new/changed image(s), {counts['skipped']} unchanged skipped")
+    logging.info(f"📊 Scanned {counts['new'] - len(errors)}/{counts['new']} images ({len(errors)} failed, profile: {profile})")
+    if counts['new']:
+        logging.info(f"🚰 Stage queues: {stream.summary()}")
+    if get_ocr_cache():
+        # Lookups counted by this process and its workers; the stored stats only get pool workers' last
+        # few once they write them (ocr_cache.TOUCH_BATCH)
+        logging.info(f"🗃️ OCR cache: {metrics.to_dict()['counters'].get('ocr_cache', {})}, stored: {get_ocr_cache().stats()}")
+    if config.ocr_cascade:
+        logging.info(f"🪜 Cascade: {metrics.to_dict()['counters'].get('ocr_cascade', {})}")
+    if config.dedup:
+        logging.info(f"👯 Duplicates: {metrics.to_dict()['counters'].get('duplicates', {})}")
+    logging.info(f"⏱️ Stage latency: {stage_summary()}")
+    if broken.is_set() and executor is not None:
+        raise BrokenProcessPool(f"an OCR worker process died; {len(errors)} image(s) not scanned")
+    return errors
+
+
+def watch_folder(folder_path, manifest, workers=1, interval=5.0, settle_seconds=2.0, profile=None):
+    # Long-running: poll for new/changed images and process them as they land
+    logging.info(f"👀 Watching {folder_path} every {interval}s")
+    executor = make_executor(workers)
+    try:
+        while True:
+            try:
+                scan_folder(folder_path, workers, executor=executor, manifest=manifest, settle_seconds=settle_seconds,
+                            profile=profile)
+            except BrokenProcessPool as e:
+                logging.warning(f"⚠️ OCR worker pool broke ({e}), starting a new one")
+                executor.shutdown(wait=False, cancel_futures=True)
+                executor = make_executor(workers)
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        logging.info("👋 Stopped watching")
+    finally:
+        if executor:
+            executor.shutdown()
@@ -0,0 +1,205 @@
+from io import BytesIO
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# "full":       decode at full colour resolution, grayscale, medianBlur(3), Otsu (the original path)
+# "normalized": decode straight to grayscale at a reduced scale, then resample so the median
+#               glyph height is target_text_height pixels before blur + Otsu
+# Either mode can add crop=True to cut the photo down to the receipt (perspective-corrected) first.
+PREPROCESS_MODES = ("full", "normalized")
+
+# "otsu":     medianBlur(3) + global Otsu, the first pass every image gets
+# "adaptive": local Gaussian threshold, for uneven lighting and shadows across the paper
+# "clahe":    local contrast equalization before Otsu, for faded thermal print
+# "morph":    adaptive threshold, then speckle removal and small-gap closing on the ink
+BINARIZATIONS = ("otsu", "adaptive", "clahe", "morph")
+
+REDUCED_GRAYSCALE = {
+    1: cv2.IMREAD_GRAYSCALE,
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+
+
+def image_size(image_bytes):
+    # Header-only read; PIL doesn't decode pixels until asked
+    try:
+        with Image.open(BytesIO(image_bytes)) as im:
+            return im.size
+    except Exception:
+        return None
+
+
+def decode_gray(image_bytes, min_side=1600):
+    # Largest power-of-two reduction that keeps the long side >= min_side.
+    # JPEG decoders scale during IDCT, so reduced decodes never materialize the full frame.
+    factor = 1
+    size = image_size(image_bytes)
+    if size:
+        while factor < 8 and max(size) // (factor * 2) >= min_side:
+            factor *= 2
+    return cv2.imdecode(np.frombuffer(image_bytes, np.uint8), REDUCED_GRAYSCALE[factor])
+
+
+def order_corners(pts):
+    # -> top-left, top-right, bottom-right, bottom-left
+    pts = np.asarray(pts, dtype=np.float32).reshape(4, 2)
+    sums = pts.sum(axis=1)
+    diffs = np.diff(pts, axis=1).ravel()
+    return np.array([pts[np.argmin(sums)], pts[np.argmin(diffs)], pts[np.argmax(sums)], pts[np.argmax(diffs)]], dtype=np.float32)
+
+
+def locate_receipt(gray, work_size=800, min_area_ratio=0.15, max_area_ratio=0.95):
+    # Receipt paper is the largest bright region; find its outline on a small copy.
+    # -> 4 corner points in full-image coordinates, or None when there's nothing worth cropping
+    scale = min(1.0, work_size / max(gray.shape))
+    small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1 else gray
+    blurred = cv2.GaussianBlur(small, (5, 5), 0)
+    mask = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, np.ones((9, 9), np.uint8))
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return None
+    outline = max(contours, key=cv2.contourArea)
+    area_ratio = cv2.contourArea(outline) / float(small.shape[0] * small.shape[1])
+    if not min_area_ratio <= area_ratio <= max_area_ratio:
+        return None
+
+    approx = cv2.approxPolyDP(outline, 0.02 * cv2.arcLength(outline, True), True)
+    corners = approx if len(approx) == 4 else cv2.boxPoints(cv2.minAreaRect(outline))
+    return order_corners(corners) / scale
+
+
+def crop_receipt(gray):
+    # Perspective-correct the receipt to an upright rectangle; this also removes any rotation/skew
+    # of the paper. Returns the input unchanged when no receipt outline is found.
+    corners = locate_receipt(gray)
+    if corners is None:
+        return gray
+    tl, tr, br, bl = corners
+    width = int(max(np.linalg.norm(tr - tl), np.linalg.norm(br - bl)))
+    height = int(max(np.linalg.norm(bl - tl), np.linalg.norm(br - tr)))
+    if width < 32 or height < 32:
+        return gray
+    target = np.array([[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]], dtype=np.float32)
+    matrix = cv2.getPerspectiveTransform(corners, target)
+    return cv2.warpPerspective(gray, matrix, (width, height), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+
+
+def estimate_text_height(gray):
+    # Median height of glyph-sized connected components, or None if the image has too few to judge
+    binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)[1]
+    _, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    heights = stats[1:, cv2.CC_STAT_HEIGHT]
+    widths = stats[1:, cv2.CC_STAT_WIDTH]
+    glyphs = (heights >= 4) & (heights <= gray.shape[0] * 0.1) & (widths <= heights * 3)
+    if glyphs.sum() < 20:
+        return None
+    return float(np.median(heights[glyphs]))
+
+
+def normalize_text_height(gray, target_text_height=28, max_scale=3.0, min_scale=0.2):
+    text_height = estimate_text_height(gray)
+    if not text_height:
+        return gray
+    scale = min(max(target_text_height / text_height, min_scale), max_scale)
+    if abs(scale - 1) < 0.1:
+        return gray
+    interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_CUBIC
+    return cv2.resize(gray, None, fx=scale, fy=scale, interpolation=interpolation)
+
+
+def decode_image(image_bytes, mode="full"):
+    # -> grayscale image for the given mode, or None if the bytes can't be decoded
+    if mode == "normalized":
+        return decode_gray(image_bytes)
+    image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+    return None if image is None else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+
+def prepare_gray(gray, mode="full", target_text_height=28, crop=False):
+    # Geometry shared by every binarization, so adaptive retries don't redo it
+    if crop:
+        gray = crop_receipt(gray)
+    if mode == "normalized":
+        gray = normalize_text_height(gray, target_text_height)
+    return gray
+
+
+def threshold(gray, method="otsu"):
+    if method not in BINARIZATIONS:
+        raise ValueError(f"Unknown binarization {method!r}, expected one of {BINARIZATIONS}")
+    if method == "clahe":
+        gray = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8)).apply(gray)
+    denoised = cv2.medianBlur(gray, 3)
+    if method in ("otsu", "clahe"):
+        return cv2.threshold(denoised, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+    block = max(15, min(gray.shape[:2]) // 40 | 1)  # odd, a few text lines across
+    binary = cv2.adaptiveThreshold(denoised, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, block, 10)
+    if method == "morph":
+        kernel = np.ones((2, 2), np.uint8)
+        ink = cv2.morphologyEx(255 - binary, cv2.MORPH_OPEN, kernel)
+        binary = 255 - cv2.morphologyEx(ink, cv2.MORPH_CLOSE, kernel)
+    return binary
+
+
+def binarize(gray, mode="full", target_text_height=28, crop=False, method="otsu"):
+    return threshold(prepare_gray(gray, mode, target_text_height, crop), method)
+
+
+def preprocess_image(image_bytes, mode="full", target_text_height=28, crop=False, method="otsu"):
+    # -> binarized image ready for Tesseract, or None if the bytes can't be decoded
+    gray = decode_image(image_bytes, mode)
+    if gray is None:
+        return None
+    return binarize(gray, mode, target_text_height, crop, method)
+
+
+def quiet_row(binary, row, search):
+    # Row within `search` of `row` with the least ink (nearest one on ties), so a strip boundary
+    # falls between two text lines instead of cutting through one
+    lo, hi = max(0, row - search), min(binary.shape[0], row + search + 1)
+    ink = (binary[lo:hi] == 0).sum(axis=1)
+    candidates = np.flatnonzero(ink == ink.min()) + lo
+    return int(candidates[np.argmin(np.abs(candidates - row))])
+
+
+def header_footer_strips(binary, header_ratio=0.15, footer_ratio=0.3, min_aspect=1.5):
+    # -> (header, footer) strips of a binarized receipt for cascaded OCR, or None when the image is
+    # too short for the strips to hold vendor and total apart from the items (OCR the full page instead)
+    height, width = binary.shape[:2]
+    if height < min_aspect * width or header_ratio + footer_ratio >= 1:
+        return None
+    search = max(8, height // 60)
+    header_end = quiet_row(binary, int(height * header_ratio), search)
+    footer_start = quiet_row(binary, height - int(height * footer_ratio), search)
+    if footer_start <= header_end:
+        return None
+    return binary[:header_end], binary[footer_start:]
+
+
+def tile_rows(height, tile_height=1500, overlap=150):
+    # -> [(start, end, keep_from, keep_to)] overlapping horizontal tiles of equal height covering the image.
+    # Lines inside an overlap are read twice; the keep bands meet mid-overlap so each is kept from one tile.
+    if overlap >= tile_height:
+        raise ValueError(f"Tile overlap ({overlap}px) must be smaller than the tile height ({tile_height}px)")
+    if height <= tile_height:
+        return [(0, height, 0, height)]
+    count = -(-(height - overlap) // (tile_height - overlap))
+    step = -(-(height - overlap) // count)
+    tiles = []
+    for i in range(count):
+        start, end = i * step, min(i * step + step + overlap, height)
+        keep_from = 0 if i == 0 else start + overlap // 2
+        keep_to = height if i == count - 1 else end - overlap + overlap // 2
+        tiles.append((start, end, keep_from, keep_to))
+    return tiles
+
+
+def preprocess_signature(mode="full", target_text_height=28, crop=False):
+    # Goes into the OCR cache key: a different preprocessing path must never reuse cached text
+    signature = f"normalized{target_text_height}/median3/otsu" if mode == "normalized" else "gray/median3/otsu"
+    return f"crop/{signature}" if crop else signature
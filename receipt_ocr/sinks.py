@@ -0,0 +1,168 @@
+import csv
+import json
+import logging
+import os
+import time
+
+from .db_writer import DUPLICATE_COLUMNS, RECEIPT_COLUMNS, BufferedWriter
+
+# The scanned_receipts columns (with the near-duplicate flag) plus where each row came from, so a sink file bulk-loads straight into
+# the warehouse table (LOAD DATA INFILE, COPY, read_parquet) instead of one INSERT per receipt
+SINK_COLUMNS = RECEIPT_COLUMNS + DUPLICATE_COLUMNS + [
+    ("source", "source"),
+    ("ocr_profile", "ocr_profile"),
+    ("scanned_at", "scanned_at"),
+]
+FLOAT_COLUMNS = {"amount", "vendor_confidence", "total_confidence", "date_confidence", "confidence_score",
+                 "duplicate_distance", "duplicate_mismatch"}
+
+
+def to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def sink_record(receipt_data, columns=SINK_COLUMNS):
+    # -> {column: value}: numbers as float (None when missing or unparseable), everything else as str
+    record = {}
+    for column, key in columns:
+        value = receipt_data.get(key)
+        if column == "scanned_at" and value is None:
+            value = time.strftime("%Y-%m-%d %H:%M:%S")
+        if column in FLOAT_COLUMNS:
+            record[column] = to_float(value)
+        else:
+            record[column] = str(value) if value is not None else None
+    return record
+
+
+class FileSink(BufferedWriter):
+    """Receipt records written to a file in bulk, buffered like db_writer.ReceiptWriter.
+
+    Same add/flush/close/written/failed interface as the database writer, so the pipeline treats
+    the database and the files alike. Subclasses only say how a batch lands in the file.
+    """
+
+    extension = None
+
+    def __init__(self, path, batch_size=1000, flush_interval=5.0, columns=SINK_COLUMNS):
+        super().__init__(batch_size, flush_interval)
+        self.path = path
+        self.columns = columns
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def _row(self, receipt_data):
+        return sink_record(receipt_data, self.columns)
+
+    def _write(self, rows):
+        try:
+            self._write_batch(rows)
+        except (OSError, ValueError) as e:
+            logging.error(f"❌ {self.name} sink write to {self.path} failed: {e} ({len(rows)} receipt(s) not written)")
+            return 0
+        logging.info(f"📤 {len(rows)} receipt(s) written to {self.path}")
+        return len(rows)
+
+    def _write_batch(self, rows):
+        raise NotImplementedError
+
+    def _close(self):
+        pass
+
+    def close(self):
+        super().close()
+        with self._write_lock:
+            self._close()
+
+
+class JSONLSink(FileSink):
+    """One JSON object per line, appended: later runs add to the same file."""
+
+    name = "jsonl"
+    extension = "jsonl"
+
+    def _write_batch(self, rows):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows))
+
+
+class CSVSink(FileSink):
+    """Appended CSV with a header row when the file is new; raw_text keeps its newlines inside quotes."""
+
+    name = "csv"
+    extension = "csv"
+
+    def _write_batch(self, rows):
+        new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        with open(self.path, "a", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=[column for column, _ in self.columns])
+            if new:
+                writer.writeheader()
+            writer.writerows(rows)
+
+
+class ParquetSink(FileSink):
+    """Columnar file, one row group per flushed batch (needs pyarrow).
+
+    Parquet files can't be appended to once closed, so each scan writes its own file, finished
+    (footer written) by end_run(): when the path is taken, a timestamp goes before the extension.
+    """
+
+    name = "parquet"
+    extension = "parquet"
+
+    def __init__(self, path, batch_size=1000, flush_interval=5.0, columns=SINK_COLUMNS):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self.pa, self.pq = pa, pq
+        super().__init__(path, batch_size, flush_interval, columns)
+        self.base_path = path
+        self.schema = pa.schema([(column, pa.float64() if column in FLOAT_COLUMNS else pa.string())
+                                 for column, _ in columns])
+        self._writer = None
+
+    def next_path(self):
+        root, extension = os.path.splitext(self.base_path)
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        path, n = self.base_path, 1
+        while os.path.exists(path):
+            path = f"{root}-{stamp}{extension}" if n == 1 else f"{root}-{stamp}-{n}{extension}"
+            n += 1
+        return path
+
+    def _write_batch(self, rows):
+        if self._writer is None:
+            self.path = self.next_path()
+            self._writer = self.pq.ParquetWriter(self.path, self.schema, compression="zstd")
+        table = self.pa.Table.from_pylist(rows, schema=self.schema)
+        self._writer.write_table(table, row_group_size=len(rows))
+
+    def _close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def end_run(self):
+        written = self.flush()
+        with self._write_lock:
+            self._close()
+        return written
+
+
+RESULT_SINKS = {sink.name: sink for sink in (JSONLSink, CSVSink, ParquetSink)}
+
+
+def make_sink(name, directory, batch_size=1000, flush_interval=5.0):
+    # -> file sink writing <directory>/receipts.<extension>
+    try:
+        sink_class = RESULT_SINKS[name]
+    except KeyError:
+        raise ValueError(f"Unknown result sink {name!r}, expected one of {sorted(RESULT_SINKS)} or 'db'")
+    try:
+        sink = sink_class(os.path.join(directory, f"receipts.{sink_class.extension}"), batch_size, flush_interval)
+    except ImportError as e:
+        raise RuntimeError(f"Result sink {name!r} needs a package that isn't installed: {e}")
+    logging.info(f"📤 Result sink: {sink.name} -> {sink.path}")
+    return sink
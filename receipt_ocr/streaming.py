@@ -0,0 +1,158 @@
+import logging
+import queue
+import threading
+import time
+
+_DONE = object()
+_active = set()
+_active_lock = threading.Lock()
+
+
+class Stage:
+    """Worker threads behind one bounded queue: take an item, run fn on it, hand the result to the next stage.
+
+    Items are dicts. fn returns the (updated) item; if it raises, the item gets an "error" entry and
+    later stages pass it along untouched, except a stage with errors=True (e.g. the one that reports them).
+    An ordered stage (one thread, last in the pipeline) runs fn in the order items were fed in, however
+    the threads before it finished them: early arrivals wait in a reorder buffer.
+    """
+
+    def __init__(self, name, fn, threads=1, maxsize=16, errors=False, ordered=False):
+        if ordered and threads != 1:
+            raise ValueError(f"Stage {name!r}: an ordered stage runs on one thread")
+        self.name = name
+        self.fn = fn
+        self.threads = threads
+        self.errors = errors
+        self.ordered = ordered
+        self.window = None     # set by StreamPipeline: released once per item an ordered stage finishes
+        self.held_peak = 0     # most items an ordered stage held back at once
+        self._held = {}
+        self._next_seq = 0
+        self.inbox = queue.Queue(maxsize)
+        self.next = None
+        self.peak = 0          # deepest the inbox got
+        self.busy_s = 0.0      # time spent in fn, summed over threads
+        self.blocked_s = 0.0   # time spent waiting for room in the next stage's inbox
+        self._running = 0
+        self._lock = threading.Lock()
+        self._workers = []
+
+    def put(self, item):
+        self.inbox.put(item)
+        self.peak = max(self.peak, self.inbox.qsize())
+
+    def start(self):
+        self._running = self.threads
+        self._workers = [threading.Thread(target=self._run, name=f"scan-{self.name}-{i}", daemon=True)
+                         for i in range(self.threads)]
+        for worker in self._workers:
+            worker.start()
+
+    def _run(self):
+        while True:
+            item = self.inbox.get()
+            if item is _DONE:
+                break
+            if not self.ordered:
+                self._process(item)
+                continue
+            self._held[item["seq"]] = item
+            self.held_peak = max(self.held_peak, len(self._held))
+            while self._next_seq in self._held:
+                self._process(self._held.pop(self._next_seq))
+                self._next_seq += 1
+                self.window.release()
+        for seq in sorted(self._held):  # only if the feed stopped early and left a gap
+            self._process(self._held.pop(seq))
+        with self._lock:
+            self._running -= 1
+            last = self._running == 0
+        if last and self.next is not None:
+            self.next.close()
+
+    def _process(self, item):
+        start = time.perf_counter()
+        if self.errors or not item.get("error"):
+            try:
+                item = self.fn(item)
+            except Exception as e:
+                logging.exception(f"❌ {self.name} failed for {item.get('name')}")
+                item["error"] = f"{type(e).__name__}: {e}"
+        busy = time.perf_counter() - start
+        if self.next is not None:
+            self.next.put(item)
+        with self._lock:
+            self.busy_s += busy
+            self.blocked_s += time.perf_counter() - start - busy
+
+    def close(self):
+        # No more input: one end marker per thread; the last thread out closes the next stage
+        for _ in range(self.threads):
+            self.inbox.put(_DONE)
+
+    def join(self):
+        for worker in self._workers:
+            worker.join()
+
+
+class StreamPipeline:
+    """Stages chained by bounded queues. Memory depends on the queue sizes, not on how many items go in.
+
+    With an ordered last stage, items get a "seq" number as they are fed in and at most the sum of the
+    queue sizes are in flight, so its reorder buffer stays within that too.
+    """
+
+    def __init__(self, stages):
+        self.stages = stages
+        for stage, next_stage in zip(stages, stages[1:]):
+            stage.next = next_stage
+        if any(stage.ordered for stage in stages[:-1]):
+            raise ValueError("Only the last stage can be ordered")
+        self.window = None
+        if stages[-1].ordered:
+            self.window = threading.Semaphore(sum(stage.inbox.maxsize for stage in stages))
+            stages[-1].window = self.window
+
+    def run(self, items):
+        # Feeds items from the calling thread (blocking while the first stage is full) and waits for the last one
+        for stage in self.stages:
+            stage.start()
+        with _active_lock:
+            _active.add(self)
+        try:
+            for seq, item in enumerate(items):
+                if self.window is not None:
+                    item["seq"] = seq
+                    self.window.acquire()  # the ordered stage releases it once this item is done
+                self.stages[0].put(item)
+        finally:
+            self.stages[0].close()
+            for stage in self.stages:
+                stage.join()
+            with _active_lock:
+                _active.discard(self)
+
+    def depths(self):
+        return {stage.name: stage.inbox.qsize() for stage in self.stages}
+
+    def summary(self):
+        # Where the time went: a stage with a high peak and high busy time is the bottleneck,
+        # the ones before it show up as blocked
+        summary = {stage.name: {"peak": stage.peak, "busy_s": round(stage.busy_s, 2), "blocked_s": round(stage.blocked_s, 2)}
+                   for stage in self.stages}
+        for stage in self.stages:
+            if stage.ordered:
+                summary[stage.name]["held_peak"] = stage.held_peak
+        return summary
+
+
+def queue_depths():
+    # Current inbox depth per stage, summed over running pipelines (for /metrics)
+    with _active_lock:
+        pipelines = list(_active)
+    depths = {}
+    for pipeline in pipelines:
+        for name, depth in pipeline.depths().items():
+            depths[name] = depths.get(name, 0) + depth
+    return depths
@@ -0,0 +1,101 @@
+from collections import Counter, defaultdict
+
+from fuzzywuzzy import fuzz
+from fuzzywuzzy.utils import full_process
+
+
+def sort_tokens(s):
+    # Same preprocessing fuzz.token_sort_ratio applies internally
+    return " ".join(sorted(full_process(s, force_ascii=True).split()))
+
+
+def char_overlap(a_counts, b_counts):
+    # Characters two strings have in common as multisets: no alignment (difflib matches or LCS) can use more
+    if len(a_counts) > len(b_counts):
+        a_counts, b_counts = b_counts, a_counts
+    return sum(min(count, b_counts.get(ch, 0)) for ch, count in a_counts.items())
+
+
+def score_bound(matches, total):
+    # fuzz's int(round(100 * 2M / T)) for at most `matches` matching characters
+    return int(round(100 * 2.0 * matches / total)) if total else 0
+
+
+class VendorIndex:
+    """Known-store matcher: normalized and deduplicated once, scored with exact early cutoffs.
+
+    Scoring modes mirror the old loops:
+      "token_sort" -> fuzz.token_sort_ratio(line.upper(), store.upper())
+      "ratio"      -> fuzz.ratio(line.upper(), store.upper())
+      "partial"    -> fuzz.partial_ratio(line.upper(), store.upper())
+
+    A store is only scored when an upper bound on its score (from the string lengths, then from the
+    characters the line and store share) could still beat the best so far. The bounds never
+    underestimate, so results are exactly the old loops' (benchmarks/compare_vendor_index.py).
+    """
+
+    def __init__(self, stores):
+        self.names = []
+        self.forms = {"upper": [], "sorted": []}
+        self.counts = {"upper": [], "sorted": []}
+        self.by_length = {"upper": defaultdict(list), "sorted": defaultdict(list)}
+
+        seen = set()
+        for store in stores:
+            key = " ".join(store.upper().split())
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            idx = len(self.names)
+            self.names.append(store)
+            for form, value in (("upper", store.upper()), ("sorted", sort_tokens(store))):
+                self.forms[form].append(value)
+                self.counts[form].append(Counter(value))
+                self.by_length[form][len(value)].append(idx)
+
+    def __len__(self):
+        return len(self.names)
+
+    def candidates(self, form, length, cutoff):
+        # Stores whose length alone doesn't rule out a ratio above cutoff, in list order (ties go to
+        # the earliest store, like the old loops)
+        return sorted(idx for store_length, indices in self.by_length[form].items()
+                      if score_bound(min(length, store_length), length + store_length) > cutoff
+                      for idx in indices)
+
+    def best_match(self, lines, mode="token_sort", threshold=75):
+        """Return (store, score, matched_line); store is None when nothing scores above threshold."""
+        best_match = None
+        best_score = 0
+        matched_line = ""
+        form = "sorted" if mode == "token_sort" else "upper"
+        for line in lines:
+            a = sort_tokens(line) if mode == "token_sort" else line.upper()
+            a_counts = Counter(a)
+            if mode == "partial":
+                indices = range(len(self.names))
+            else:
+                indices = self.candidates(form, len(a), max(best_score, threshold))
+            for idx in indices:
+                b = self.forms[form][idx]
+                overlap = char_overlap(a_counts, self.counts[form][idx])
+                if mode == "partial":
+                    # partial_ratio compares the shorter string with windows of the longer one that are
+                    # at most as long, so 2M / (shorter + window) <= 2M / (shorter + M)
+                    shorter = min(len(a), len(b))
+                    bound = score_bound(overlap, shorter + overlap) if a != b else 100
+                else:
+                    bound = score_bound(overlap, len(a) + len(b)) if a != b else 100
+                if bound <= max(best_score, threshold):
+                    continue
+                if mode == "partial":
+                    score = fuzz.partial_ratio(line.upper(), b)
+                else:
+                    score = fuzz.ratio(a, b)
+                if score > best_score and score > threshold:
+                    best_score = score
+                    best_match = self.names[idx]
+                    matched_line = line
+                    if score == 100:
+                        return best_match, best_score, matched_line
+        return best_match, best_score, matched_line